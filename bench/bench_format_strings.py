@@ -0,0 +1,126 @@
+"""Micro-benchmark of stats.utils.format_strings.
+
+Compares the current implementation against the original recursive version
+which unquoted every string. Pass recorded responses to measure, either raw
+JSON files or a response cache (directory or .db) from `--cache`, otherwise
+synthetic session results and laps are used.
+
+Usage:
+    python bench/bench_format_strings.py [PATH ...]
+"""
+
+
+import io
+import os
+import sys
+import copy
+import glob
+import json
+import sqlite3
+import timeit
+from urllib.parse import unquote_plus
+
+from irace.stats import utils
+from irace.stats.constants import StringFields
+
+
+def original_format_strings(results):
+    """format_strings as it was, for comparison."""
+
+    if isinstance(results, (list, tuple)):
+        for result in results:
+            original_format_strings(result)
+        return
+
+    for key, value in results.items():
+        if isinstance(value, str):
+            results[key] = unquote_plus(unquote_plus(results[key]))
+        elif isinstance(value, (list, tuple)):
+            for nested in value:
+                original_format_strings(nested)
+        elif isinstance(value, dict):
+            original_format_strings(value)
+
+
+def synthetic():
+    """Yield (name, url, response) of made up results and laps."""
+
+    yield "synthetic results", None, {"rows": [{
+        "displayname": "Some+Driver%2520{}".format(i),
+        "custid": str(100000 + i),
+        "carname": "Mazda+MX-5+Cup",
+        "reasonout": "Running",
+        "interval": 12345 * i,
+        "finishpos": i,
+    } for i in range(60)] * 3}
+
+    yield "synthetic laps", "membersite/member/GetLaps", {
+        "header": {"trackName": "Road+America", "trackConfig": "Full"},
+        "drivers": [{"displayname": "Some+Driver", "custid": 1}],
+        "lapData": [{
+            "lap_num": i,
+            "flags": i % 7,
+            "ses_time": 1000000 * i,
+            "custid": "1",
+        } for i in range(2000)],
+    }
+
+
+def recorded(paths):
+    """Yield (name, url, response) of recorded responses at paths."""
+
+    for path in paths:
+        if path.endswith((".db", ".sqlite")):
+            conn = sqlite3.connect(path)
+            for url, body in conn.execute("SELECT url, body FROM responses"):
+                yield url, url, json.loads(body)
+        elif os.path.isdir(path):
+            for cached in glob.glob(os.path.join(path, "*", "*.json")):
+                with io.open(cached, "r", encoding="utf-8") as open_cached:
+                    entry = json.load(open_cached)
+                yield entry["url"], entry["url"], json.loads(entry["text"])
+        else:
+            with io.open(path, "r", encoding="utf-8") as open_response:
+                yield path, None, json.load(open_response)
+
+
+def main():
+    """Run the benchmark."""
+
+    responses = recorded(sys.argv[1:]) if sys.argv[1:] else synthetic()
+
+    for name, url, response in responses:
+        if not isinstance(response, (dict, list)):
+            continue
+
+        fields = StringFields.get(url) if isinstance(response, dict) else None
+        original, current = copy.deepcopy(response), copy.deepcopy(response)
+        original_format_strings(original)
+        utils.format_strings(current, fields)
+        if original != current:
+            print("{}: results differ!".format(name))
+
+        number = 20
+        before = timeit.timeit(
+            lambda: original_format_strings(copy.deepcopy(response)),
+            number=number,
+        )
+        after = timeit.timeit(
+            lambda: utils.format_strings(copy.deepcopy(response), fields),
+            number=number,
+        )
+        baseline = timeit.timeit(
+            lambda: copy.deepcopy(response),
+            number=number,
+        )
+        before, after = before - baseline, after - baseline
+        print("{}: {:.2f}ms -> {:.2f}ms ({:.1f}x)".format(
+            name,
+            before * 1000 / number,
+            after * 1000 / number,
+            before / after if after > 0 else float("inf"),
+        ))
+
+
+if __name__ == "__main__":
+    main()
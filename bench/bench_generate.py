@@ -0,0 +1,158 @@
+"""Benchmark of irace-generate on a big season.
+
+Writes a synthetic league with one big season of results and laps, then
+times full builds of the HTML from it. Pass a results directory (or
+sqlite:<path>) from irace-populate to time that instead. Run it at two
+revisions to compare them, eg; before and after a change to the parsing.
+
+Usage:
+    python bench/bench_generate.py [PATH]
+"""
+
+
+import os
+import sys
+import json
+import random
+import tempfile
+import contextlib
+from timeit import default_timer
+
+from irace import generate
+
+
+LEAGUE = 637
+SEASON = 50
+RACES = 30
+DRIVERS = 60
+LAPS = 80
+
+
+def _write(path, obj):
+    """Write the object as JSON to path, creating its directory."""
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as open_file:
+        json.dump(obj, open_file)
+
+
+def synthetic(path):
+    """Write a made up league with a big season to the results path."""
+
+    rand = random.Random(7)
+    league = os.path.join(path, "{}", str(LEAGUE))
+
+    _write(os.path.join(path, "leagues", "{}.json".format(LEAGUE)), {
+        "leagueid": LEAGUE,
+        "leaguename": "Benchmark League",
+    })
+    for driver in range(DRIVERS):
+        _write(os.path.join(league.format("members"), "{}.json".format(
+            1000 + driver,
+        )), {"custID": 1000 + driver, "displayName": "Driver {}".format(
+            driver,
+        )})
+    _write(os.path.join(league.format("seasons"), "{}.json".format(SEASON)), {
+        "league_season_id": SEASON,
+        "league_season_name": "Big Season",
+    })
+
+    for race in range(RACES):
+        sub_session_id = 9000 + race
+        order = list(range(DRIVERS))
+        rand.shuffle(order)
+
+        _write(os.path.join(
+            league.format("races"),
+            str(SEASON),
+            "{}.json".format(sub_session_id),
+        ), {
+            "subsessionid": sub_session_id,
+            "track_name": "Track {}".format(race),
+            "eventlapscomplete": LAPS,
+            "cornersperlap": 14,
+            "rows": [{
+                "simsesname": session,
+                "finishpos": position,
+                "startpos": rand.randrange(DRIVERS),
+                "custid": 1000 + driver,
+                "groupid": 1000 + driver,
+                "displayname": "Driver {}".format(driver),
+                "interval": position * 12345,
+                "lapscomplete": LAPS,
+                "reasonout": "Running",
+                "bestlapnum": rand.randrange(1, LAPS),
+                "bestlaptime": 900000 + rand.randrange(50000),
+                "incidents": rand.randrange(8),
+                "league_points": max(0, 50 - position),
+            } for position, driver in enumerate(order)
+              for session in ("PRACTICE", "QUALIFY", "RACE")],
+        })
+
+        for driver in range(DRIVERS):
+            session_time = 0
+            lap_data = []
+            for lap in range(LAPS + 1):
+                lap_data.append({
+                    "lap_num": lap,
+                    "flags": rand.choice((0, 0, 0, 1, 4, 32, 36, 2)),
+                    "ses_time": session_time,
+                })
+                session_time += 900000 + rand.randrange(80000)
+            _write(os.path.join(
+                league.format("laps"),
+                str(SEASON),
+                str(sub_session_id),
+                "{}.json".format(1000 + driver),
+            ), {
+                "header": {"trackName": "Track {}".format(race),
+                           "trackConfig": "Full"},
+                "drivers": [{"displayname": "Driver {}".format(driver),
+                             "custid": 1000 + driver,
+                             "bestlaptime": 900000 + rand.randrange(50000),
+                             "bestlapnum": rand.randrange(1, LAPS)}],
+                "lapData": lap_data,
+            })
+
+
+def build(results, output):
+    """Run a full irace-generate build, returning the seconds it took."""
+
+    sys.argv = ["irace-generate", "--input", results, "--output", output]
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            start = default_timer()
+            generate.main()
+            return default_timer() - start
+
+
+def main():
+    """Run the benchmark."""
+
+    with tempfile.TemporaryDirectory() as temp:
+        if sys.argv[1:]:
+            name = results = sys.argv[1]
+        else:
+            name = "synthetic season ({} races, {} drivers, {} laps)".format(
+                RACES,
+                DRIVERS,
+                LAPS,
+            )
+            results = os.path.join(temp, "results")
+            synthetic(results)
+
+        number = 3
+        times = [
+            build(results, os.path.join(temp, "html{}".format(i)))
+            for i in range(number)
+        ]
+        print("{}: best {:.2f}s, mean {:.2f}s of {} builds".format(
+            name,
+            min(times),
+            sum(times) / number,
+            number,
+        ))
+
+
+if __name__ == "__main__":
+    main()
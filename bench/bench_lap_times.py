@@ -0,0 +1,131 @@
+"""Micro-benchmark of lap times in parse.laps.
+
+Compares parsing and formatting every lap time with integer ticks against
+the original timedelta per lap, as the race pages of a season do. Pass
+results directories from irace-populate to measure, otherwise a synthetic
+season of laps is used.
+
+Usage:
+    python bench/bench_lap_times.py [PATH ...]
+"""
+
+
+import sys
+import timeit
+from datetime import timedelta
+
+from irace.parse.laps import Laps
+from irace.store import open_store
+
+
+def original_time_string(timestamp):
+    """parse.utils.time_string as it was, for comparison."""
+
+    seconds = timestamp.total_seconds() if \
+        isinstance(timestamp, timedelta) else timestamp
+    if seconds <= 0:
+        return "--:--"
+
+    hours, remaining = divmod(seconds, 3600)
+    minutes, remaining = divmod(remaining, 60)
+    seconds, microseconds = divmod(remaining, 1)
+
+    timestr = "{:02}:{:02}.{:04}".format(
+        int(minutes),
+        int(seconds),
+        int(microseconds * 10000)
+    )
+
+    if hours:
+        return "{:02}:{}".format(int(hours), timestr)
+
+    return timestr
+
+
+def original_lap_times(data):
+    """Lap and total time strings as they were, for comparison."""
+
+    times = []
+    prev = 0
+    for lap in data["lapData"]:
+        times.append(timedelta(seconds=(lap["ses_time"] - prev) / 10000.0))
+        prev = lap["ses_time"]
+
+    strings = [original_time_string(x) for x in times[1:]]
+    strings.append(
+        original_time_string(sum(x.total_seconds() for x in times))
+    )
+    return strings
+
+
+def current_lap_times(data):
+    """Lap and total time strings from integer ticks."""
+
+    laps = Laps(data)
+    strings = [lap.time_string for lap in laps.laps[1:]]
+    strings.append(laps.total_time_string)
+    return strings
+
+
+def synthetic():
+    """Yield (name, list of lap data) of a made up season."""
+
+    yield "synthetic season", [{
+        "header": {"trackName": "Road America", "trackConfig": "Full"},
+        "drivers": [{"displayname": "Driver {}".format(driver),
+                     "custid": driver,
+                     "bestlaptime": 943573,
+                     "bestlapnum": 3}],
+        "lapData": [{
+            "lap_num": i,
+            "flags": i % 7,
+            "ses_time": 943573 * i + driver * 17 + race,
+        } for i in range(40)],
+    } for race in range(12) for driver in range(30)]
+
+
+def recorded(paths):
+    """Yield (name, list of lap data) of the results at paths."""
+
+    for path in paths:
+        yield path, open_store(path, create=False).load_all("laps")
+
+
+def main():
+    """Run the benchmark."""
+
+    seasons = recorded(sys.argv[1:]) if sys.argv[1:] else synthetic()
+
+    for name, all_laps in seasons:
+        differ = sum(
+            original_lap_times(data) != current_lap_times(data)
+            for data in all_laps
+        )
+        if differ:
+            # the original truncated float seconds, eg 1.2344 for 12345
+            print("{}: {} of {} results differ by rounding".format(
+                name,
+                differ,
+                len(all_laps),
+            ))
+
+        number = 5
+        before = timeit.timeit(
+            lambda: [original_lap_times(data) for data in all_laps],
+            number=number,
+        )
+        after = timeit.timeit(
+            lambda: [current_lap_times(data) for data in all_laps],
+            number=number,
+        )
+        print("{} ({} laps): {:.2f}ms -> {:.2f}ms ({:.1f}x)".format(
+            name,
+            sum(len(data["lapData"]) for data in all_laps),
+            before * 1000 / number,
+            after * 1000 / number,
+            before / after if after > 0 else float("inf"),
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Dependency tracking for incremental irace-generate builds.
+
+Records a signature of the input results and templates each output page was
+rendered from, so following builds only render pages whose inputs changed.
+Input hashes are cached by the version the store gives each result, so
+unchanged results aren't read again.
+
+Layout of the build JSON::
+
+    {"templates": hash of the irace version and all templates,
+     "files": {"category/id/...": [version, content hash]},
+     "pages": {output page path: signature of its inputs}}
+
+Page paths are relative to the output directory, which can move. Full builds
+don't hash their inputs nor keep a build file, so the first incremental build
+after one renders everything.
+"""
+
+
+import io
+import os
+import json
+import hashlib
+
+from . import __version__
+from .store import Store
+
+
+def templates_hash(path: str) -> str:
+    """Return a hash of the irace version and all templates under path."""
+
+    digest = hashlib.sha1(__version__.encode("utf-8"))
+    for file_path in _files(path):
+        digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+        with io.open(file_path, "rb") as open_template:
+            digest.update(open_template.read())
+    return digest.hexdigest()
+
+
+def _files(path: str) -> list:
+    """Return the sorted list of files below path."""
+
+    found = []
+    for root, _, files in os.walk(path):
+        found.extend(os.path.join(root, name) for name in files)
+    return sorted(found)
+
+
+class Build:
+    """Persistent record of what each generated page was rendered from."""
+
+    FILENAME = ".irace-build.json"
+
+    def __init__(self, store: Store, output_path: str, templates: str,
+                 incremental: bool = True):
+        self.store = store
+        self.output_path = output_path
+        self.path = os.path.join(output_path, self.FILENAME)
+        self.templates = templates
+        self.incremental = incremental
+        self.files = {}
+        self.pages = {}
+        self._cached_files = {}
+
+        if incremental and os.path.isfile(self.path):
+            try:
+                with io.open(self.path, "r", encoding="utf-8") as open_build:
+                    data = json.load(open_build)
+            except ValueError as error:
+                raise SystemExit("Invalid build file {}: {!r}".format(
+                    self.path,
+                    error,
+                ))
+            self._cached_files = data["files"]
+            if data["templates"] == templates:
+                self.pages = data["pages"]
+
+    def save(self) -> None:
+        """Write the build file to disk, replacing the previous copy.
+
+        A full build removes it instead, the pages it records are stale.
+        """
+
+        if not self.incremental:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+
+        temp_path = "{}.tmp".format(self.path)
+        with io.open(temp_path, "w", encoding="utf-8") as open_build:
+            json.dump({
+                "templates": self.templates,
+                "files": self.files,
+                "pages": self.pages,
+            }, open_build, separators=(",", ":"))
+        os.replace(temp_path, self.path)
+
+    def result_hash(self, category: str, key: tuple, version: str) -> str:
+        """Return the content hash of the stored result."""
+
+        name = "/".join([category] + [str(x) for x in key])
+        cached = self.files.get(name) or self._cached_files.get(name)
+        if cached and cached[0] == version:
+            digest = cached[1]
+        else:
+            digest = hashlib.sha1(self.store.raw(category, *key)).hexdigest()
+
+        self.files[name] = [version, digest]
+        return digest
+
+    def signature(self, inputs: list) -> str:
+        """Return the signature of the inputs, see `changed`."""
+
+        digest = hashlib.sha1(self.templates.encode("utf-8"))
+        for category, *ids in inputs:
+            for key, version in self.store.versions(category, *ids):
+                digest.update("/".join(
+                    [category] + [str(x) for x in key]
+                ).encode("utf-8"))
+                digest.update(self.result_hash(
+                    category,
+                    key,
+                    version,
+                ).encode("utf-8"))
+        return digest.hexdigest()
+
+    def changed(self, page: str, inputs: list) -> bool:
+        """Record the inputs of the page.
+
+        Args:
+            page: path of the output page
+            inputs: list of (category, *IDs) tuples of the results it's
+                    rendered from, all results below the IDs are included
+
+        Returns:
+            boolean True if the page needs to be rendered
+        """
+
+        if not self.incremental:
+            return True
+
+        key = os.path.relpath(page, self.output_path)
+        signature = self.signature(inputs)
+        changed = not os.path.isfile(page) or self.pages.get(key) != signature
+        self.pages[key] = signature
+        return changed
@@ -0,0 +1,136 @@
+"""Compressed JSON results.
+
+Results files can be written as pretty printed JSON, the default, or as
+minified JSON compressed with gzip or zstd. zstd needs the optional zstandard
+dependency (`pip install iRace[zstd]`). Reading detects the compression from
+the data itself, so every reader handles all formats.
+"""
+
+
+import io
+import gzip
+import json
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+# file extension for each format
+FORMATS = {
+    "json": ".json",
+    "gz": ".json.gz",
+    "zst": ".json.zst",
+}
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _require_zstandard() -> None:
+    """Exit if zstd is used without zstandard installed."""
+
+    if zstandard is None:
+        raise SystemExit(
+            "zstd results need zstandard, pip install iRace[zstd]"
+        )
+
+
+def validate_format(fmt: str) -> str:
+    """Return the format if valid, exits otherwise."""
+
+    if fmt not in FORMATS:
+        raise SystemExit("Invalid format {}, choose from: {}".format(
+            fmt,
+            ", ".join(FORMATS),
+        ))
+    if fmt == "zst":
+        _require_zstandard()
+    return fmt
+
+
+def strip_extension(name: str) -> str:
+    """Return the file name without its results extension, or None."""
+
+    for extension in sorted(FORMATS.values(), key=len, reverse=True):
+        if name.endswith(extension):
+            return name[:-len(extension)]
+    return None
+
+
+def gzip_compress(data: bytes) -> bytes:
+    """Return the data gzipped without a timestamp, so always the same.
+
+    gzip.compress only takes an mtime from Python 3.8.
+    """
+
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as open_gzip:
+        open_gzip.write(data)
+    return buffer.getvalue()
+
+
+def decompress(data: bytes) -> bytes:
+    """Return the data, decompressed if it is gzip or zstd."""
+
+    if data.startswith(_GZIP_MAGIC):
+        return gzip.decompress(data)
+
+    if data.startswith(_ZSTD_MAGIC):
+        _require_zstandard()
+        # frames written while streaming don't include the content size
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    return data
+
+
+def loads(data: bytes) -> object:
+    """Decode the JSON object from the possibly compressed data."""
+
+    return json.loads(decompress(data))
+
+
+def dumps(obj: object, fmt: str) -> bytes:
+    """Encode the JSON object in the format."""
+
+    if fmt == "json":
+        return json.dumps(
+            obj,
+            sort_keys=True,
+            indent=4,
+            ensure_ascii=False,
+        ).encode("utf-8")
+
+    data = json.dumps(
+        obj,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+    if fmt == "gz":
+        return gzip_compress(data)
+
+    _require_zstandard()
+    return zstandard.ZstdCompressor().compress(data)
+
+
+def open_writer(open_file, fmt: str):
+    """Return a text file-like object writing to open_file in the format.
+
+    Close the writer to finish the compressed data before open_file.
+    """
+
+    if fmt == "gz":
+        raw = gzip.GzipFile(fileobj=open_file, mode="wb", mtime=0)
+    elif fmt == "zst":
+        _require_zstandard()
+        raw = zstandard.ZstdCompressor().stream_writer(
+            open_file,
+            closefd=False,
+        )
+    else:
+        raw = open_file
+
+    return io.TextIOWrapper(raw, encoding="utf-8", write_through=True)
@@ -1,7 +1,12 @@
 """iRace web HTML generator.
 
 This script will recreate all files in the output directory based on the
-JSON files located in the input directory.
+JSON files located in the input directory. With --incremental only the pages
+whose input files or templates changed since the last run are written.
+
+With --precompress every file is also written gzipped, and with brotli if it
+is installed (`pip install iRace[brotli]`), as .gz and .br siblings for the
+web server to send as is.
 
 Usage:
     irace-generate [options]
@@ -10,8 +15,13 @@ Options:
     -h --help            show this message
     --version            display version information
     --output=<path>      output path [default: html]
-    --input=<path>       input path, from irace-populate [default: results]
+    --input=<path>       input path, from irace-populate, or sqlite:<path>
+                         [default: results]
     --preserve           preserve contents in output path
+    --incremental        only write pages whose inputs changed, preserving
+                         the rest of the output path
+    --jobs=<n>           processes to render pages with [default: 1]
+    --precompress        also write .gz and .br compressed copies of files
 """
 
 
@@ -19,24 +29,28 @@ import io
 import os
 import json
 import shutil
-from glob import glob
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 import jinja2
 
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+from .build import Build
+from .build import templates_hash
+from .store import Store
+from .store import open_store
+from .compression import gzip_compress
 from .utils import get_args
 from .parse import Laps
 from .parse import Race
 from .parse import Season
-from .parse.utils import time_string
 from .parse.utils import time_string_raw
 
 
-def _has_depth(path: str, depth: int) -> bool:
-    """Check if the path has some files in the required depth."""
-
-    return glob(os.path.join(path, *["*"] * depth)) != []
-
-
 def _depth(path: str) -> int:
     """Returns the depth of path."""
 
@@ -62,94 +76,60 @@ def _make_missing(path: str) -> None:
 def _ensure_paths(args: dict) -> None:
     """Ensure the input and output paths exist and are valid."""
 
-    input_path = args["--input"]
-    if not os.path.exists(input_path) or not os.path.isdir(input_path):
+    try:
+        store = open_store(args["--input"], create=False)
+    except (FileNotFoundError, SystemExit):
         raise SystemExit("Input path does not exist or is a file")
 
-    path_depths = {
-        "leagues": (os.path.join(input_path, "leagues"), 1),
-        "members": (os.path.join(input_path, "members"), 2),
-        "seasons": (os.path.join(input_path, "seasons"), 2),
-        "races": (os.path.join(input_path, "races"), 3),
-        "laps": (os.path.join(input_path, "laps"), 4),
-    }
-
     all_leagues = []
-    for key, depths in path_depths.items():
-        if not os.path.isdir(depths[0]) or not _has_depth(*depths):
-            raise SystemExit("Missing {} results".format(key))
-
-        if key == "leagues":
-            continue
-
-        leagues_found = []
-        for league_path in glob(os.path.join(depths[0], "*")):
-            try:
-                leagues_found.append(int(os.path.split(league_path)[1]))
-            except ValueError:
-                raise SystemExit("Invalid path found in results, aborting")
-
-        if all_leagues == []:
-            all_leagues = leagues_found
-        elif all_leagues != leagues_found:
-            raise SystemExit("Incomplete result data, aborting")
+    try:
+        for key in Store.CATEGORIES:
+            if not store.keys(key):
+                raise SystemExit("Missing {} results".format(key))
+
+            if key == "leagues":
+                continue
+
+            leagues_found = store.ids(key)
+            if all_leagues == []:
+                all_leagues = leagues_found
+            elif all_leagues != leagues_found:
+                raise SystemExit("Incomplete result data, aborting")
+    except ValueError:
+        raise SystemExit("Invalid path found in results, aborting")
 
     output_path = args["--output"]
 
-    if not args["--preserve"] and os.path.exists(output_path):
+    if not args["--preserve"] and not args["--incremental"] and \
+            os.path.exists(output_path):
         shutil.rmtree(output_path)
 
     _make_missing(output_path)
 
     args["leagues"] = all_leagues
-    args["paths"] = {key: value[0] for key, value in path_depths.items()}
-    args["paths"]["output"] = output_path
+    args["store"] = store
+    args["paths"] = {"output": output_path}
 
     args.pop("--input")
     args.pop("--output")
 
 
-def _read_data(args: dict, data_type: str, *sub: str) -> list:
-    """Read all JSON data at path."""
+def _read_keys(store: Store, data_type: str, keys: list) -> list:
+    """Read the results of the type with the IDs in keys."""
 
-    data = []
-    path = os.path.join(args["paths"][data_type], *[str(x) for x in sub], "*")
-    for json_path in glob(path):
-        try:
-            with io.open(json_path, "r", encoding="utf-8") as open_data:
-                data.append(json.load(open_data))
-        except Exception as err:
-            raise SystemExit("Failed to read {}: {!r}".format(data_type, err))
-    return data
+    try:
+        return [store.load(data_type, *key) for key in keys]
+    except Exception as err:
+        raise SystemExit("Failed to read {}: {!r}".format(data_type, err))
 
 
-def _read_json(args: dict) -> dict:
-    """Read all JSON data."""
+def _read_data(args: dict, data_type: str, *sub: int) -> list:
+    """Read all results of the type below the IDs."""
 
-    return {
-        "leagues": _read_data(args, "leagues"),
-        "data": {league: {
-            "members": _read_data(args, "members", league),
-            "seasons": [{
-                "season": season,
-                "races": [{
-                    "race": race,
-                    "laps": [Laps(lap_data) for lap_data in _read_data(
-                        args,
-                        "laps",
-                        league,
-                        season["league_season_id"],
-                        race["subsessionid"],
-                    )],
-                } for race in _read_data(
-                    args,
-                    "races",
-                    league,
-                    season["league_season_id"],
-                )],
-            } for season in _read_data(args, "seasons", league)],
-        } for league in args["leagues"]},
-    }
+    try:
+        return args["store"].load_all(data_type, *sub)
+    except Exception as err:
+        raise SystemExit("Failed to read {}: {!r}".format(data_type, err))
 
 
 def _get_templates() -> dict:
@@ -161,7 +141,6 @@ def _get_templates() -> dict:
     )
 
     # jinja2 helpers
-    env.globals["time_string"] = time_string
     env.globals["time_string_raw"] = time_string_raw
 
     return {
@@ -170,20 +149,170 @@ def _get_templates() -> dict:
     }
 
 
-def _write_file(content: str, path: str) -> None:
-    """Write the content to the file at path."""
+# templates of this process, loaded once by _init_process
+_TEMPLATES = {}
 
-    with io.open(path, "w", encoding="utf-8") as open_file:
-        open_file.write(content)
+# compressed copy extensions written with every file, set by _init_process
+_PRECOMPRESS = []
 
+# compress functions for each compressed copy extension
+_COMPRESSORS = {
+    ".gz": gzip_compress,
+    ".br": lambda data: brotli.compress(data),
+}
 
-def _write_members(templates: dict, base_path: str, members: list,
-                   league_info: dict) -> None:
-    """Write templated member data to disk."""
 
-    _make_missing(os.path.join(base_path, "members"))
+def _precompress_extensions(precompress: bool) -> tuple:
+    """Return the compressed copy extensions to write, if precompressing."""
+
+    if not precompress:
+        return ()
+    if brotli is None:
+        return (".gz", )
+    return (".gz", ".br")
+
+
+def _init_process(precompress: tuple) -> None:
+    """Load the templates and set what to write for this process."""
+
+    if not _TEMPLATES:
+        _TEMPLATES.update(_get_templates())
+    _PRECOMPRESS[:] = precompress
+
+
+class _Renderer:
+    """Runs page writing jobs here, or in a pool of worker processes.
+
+    Every process loads the templates once, workers when they start. Jobs
+    are module level functions and their arguments must pickle. Only a few
+    jobs per worker are queued at once, so their data isn't all in memory.
+    Files are compressed by the process writing them, so in parallel too.
+    Jobs return a Counter of written file statuses, totalled in written.
+    """
+
+    def __init__(self, jobs: int = 1, precompress: tuple = ()):
+        self.written = Counter()
+        self._pool = None
+        self._pending = []
+        self._max_pending = jobs * 2
+        if jobs > 1:
+            self._pool = ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=_init_process,
+                initargs=(precompress, ),
+            )
+        _init_process(precompress)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        try:
+            self.wait()
+        finally:
+            if self._pool is not None:
+                # jobs not yet started are cancelled on an error, by hand as
+                # shutdown(cancel_futures=True) needs Python 3.9
+                for future in self._pending:
+                    future.cancel()
+                self._pool.shutdown()
+
+    def submit(self, func, *args) -> None:
+        """Run func(*args), now if serial or later by a worker."""
+
+        if self._pool is None:
+            self.written.update(func(*args))
+            return
+
+        while len(self._pending) >= self._max_pending:
+            self.written.update(self._pending.pop(0).result())
+        self._pending.append(self._pool.submit(func, *args))
+
+    def wait(self) -> None:
+        """Wait for all submitted jobs, raising the first error."""
+
+        while self._pending:
+            self.written.update(self._pending.pop(0).result())
+
+
+def _read_bytes(path: str) -> bytes:
+    """Return the contents of the file at path, or None if missing."""
+
+    try:
+        with io.open(path, "rb") as open_file:
+            return open_file.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_bytes(data: bytes, path: str) -> None:
+    """Write the data to path atomically, through a temp file."""
+
+    temp_path = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with io.open(temp_path, "wb") as open_file:
+            open_file.write(data)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _write_file(content: str, path: str) -> str:
+    """Write the content to the file at path, and its compressed copies.
+
+    Files with the same content aren't rewritten, so their mtime is kept for
+    caching and syncing. Compressed copies are only written with the file or
+    if missing. Copies no longer wanted are removed, so none are left stale.
+
+    Returns:
+        string status of the file, "new", "updated" or "unchanged"
+    """
+
+    data = content.encode("utf-8")
+    previous = _read_bytes(path)
+    if previous is None:
+        status = "new"
+    elif previous == data:
+        status = "unchanged"
+    else:
+        status = "updated"
+
+    if status != "unchanged":
+        _write_bytes(data, path)
+
+    for extension, compress in _COMPRESSORS.items():
+        copy_path = path + extension
+        if extension not in _PRECOMPRESS:
+            if os.path.exists(copy_path):
+                os.remove(copy_path)
+        elif status != "unchanged" or not os.path.exists(copy_path):
+            _write_bytes(compress(data), copy_path)
+
+    return status
+
+
+def _write_members(base_path: str, members: list, league_info: dict,
+                   pages: set, listing: bool) -> Counter:
+    """Write templated member data to disk.
+
+    Args:
+        base_path: output path of the league
+        members: list of all member dictionaries in the league
+        league_info: league information dictionary
+        pages: set of member IDs to write the pages of
+        listing: boolean to write the members listing page
+
+    Returns:
+        Counter of written file statuses
+    """
+
+    templates = _TEMPLATES
+    written = Counter()
     for member in members:
-        _write_file(
+        if member["custID"] not in pages:
+            continue
+        written[_write_file(
             templates["member.html"].render(
                 member=member,
                 league=league_info,
@@ -193,58 +322,181 @@ def _write_members(templates: dict, base_path: str, members: list,
                 "members",
                 "{}.html".format(member["custID"]),
             ),
-        )
+        )] += 1
 
-    _write_file(
-        templates["members.html"].render(
-            members=members,
+    if listing:
+        written[_write_file(
+            templates["members.html"].render(
+                members=members,
+                league=league_info,
+            ),
+            os.path.join(base_path, "members.html"),
+        )] += 1
+
+    return written
+
+
+def _lap_json(race: Race) -> str:
+    """Return the compact lap table JSON of the race, by driver ID.
+
+    Lap rows are [lap, time, flags] strings, formatted as shown.
+    """
+
+    return json.dumps({
+        laps.driver_id: {
+            "driver": laps.driver,
+            "laps": [[
+                lap.lap,
+                "--:--" if lap.lap == 0 else lap.time_string,
+                ", ".join(lap.flag_names),
+            ] for lap in laps.laps],
+        } for laps in race.laps
+    }, separators=(",", ":"), ensure_ascii=False)
+
+
+def _write_race(store: Store, base_path: str, league: int, season: dict,
+                league_info: dict, race_id: int, laps: list) -> Counter:
+    """Read the race and its laps, write its page and lap JSON to disk.
+
+    Args:
+        store: Store to read results from
+        base_path: output path of the league
+        league: league ID
+        season: season information dictionary
+        league_info: league information dictionary
+        race_id: subsession ID of the race
+        laps: list of lap ID tuples of the race
+
+    Returns:
+        Counter of written file statuses
+    """
+
+    season_id = season["league_season_id"]
+    race = Race(
+        [Laps(lap_data) for lap_data in _read_keys(store, "laps", laps)],
+        _read_keys(store, "races", [(league, season_id, race_id)])[0],
+    )
+    page_path = os.path.join(
+        base_path,
+        "seasons",
+        str(season_id),
+        str(race.race["subsessionid"]),
+    )
+
+    written = Counter()
+    written[_write_file(
+        _TEMPLATES["race.html"].render(
+            season=season,
+            race=race,
             league=league_info,
         ),
-        os.path.join(base_path, "members.html"),
+        "{}.html".format(page_path),
+    )] += 1
+    written[_write_file(
+        _lap_json(race),
+        "{}.laps.json".format(page_path),
+    )] += 1
+    return written
+
+
+def _write_season(store: Store, base_path: str, league: int, season: dict,
+                  league_info: dict, races: list) -> Counter:
+    """Read the season's race results and write its page to disk.
+
+    Args:
+        store: Store to read results from
+        base_path: output path of the league
+        league: league ID
+        season: season information dictionary
+        league_info: league information dictionary
+        races: list of subsession IDs in the season
+
+    Returns:
+        Counter of written file statuses
+    """
+
+    season_id = season["league_season_id"]
+    race_data = _read_keys(
+        store,
+        "races",
+        [(league, season_id, race) for race in races],
     )
 
+    written = Counter()
+    written[_write_file(
+        _TEMPLATES["season.html"].render(
+            season=Season([Race([], race) for race in race_data], season),
+            league=league_info,
+            races=race_data,
+        ),
+        os.path.join(base_path, "seasons", "{}.html".format(season_id)),
+    )] += 1
+    return written
+
 
-def _write_seasons(templates: dict, base_path: str, seasons: list,
+def _write_seasons(renderer: _Renderer, build: Build, args: dict,
+                   base_path: str, league: int, seasons: list,
                    league_info: dict) -> None:
-    """Write templated season data to disk."""
+    """Write templated season data to disk, a job per changed page.
+
+    Each race page, with its lap JSON, is a job reading its own laps. The
+    season page only needs the race results, it depends on every race in
+    the season so is written whenever any race page is. Unchanged seasons
+    aren't read at all.
+    """
 
+    store = args["store"]
     _make_missing(os.path.join(base_path, "seasons"))
     for season in seasons:
-        season_races = []
-        for race in season["races"]:
-            _make_missing(os.path.join(
-                base_path,
-                "seasons",
-                str(season["season"]["league_season_id"]),
-            ))
-            race_obj = Race(race["laps"], race["race"])
-            season_races.append(race_obj)
-            _write_file(
-                templates["race.html"].render(
-                    season=season["season"],
-                    race=race_obj,
-                    league=league_info,
-                ),
-                os.path.join(
+        season_id = season["league_season_id"]
+        inputs = [("leagues", league), ("seasons", league, season_id)]
+
+        races = store.ids("races", league, season_id)
+        if races:
+            _make_missing(os.path.join(base_path, "seasons", str(season_id)))
+
+        for race in races:
+            if build.changed(
+                    os.path.join(
+                        base_path,
+                        "seasons",
+                        str(season_id),
+                        "{}.html".format(race),
+                    ),
+                    inputs + [
+                        ("races", league, season_id, race),
+                        ("laps", league, season_id, race),
+                    ]):
+                renderer.submit(
+                    _write_race,
+                    store,
                     base_path,
-                    "seasons",
-                    str(season["season"]["league_season_id"]),
-                    "{}.html".format(race["race"]["subsessionid"]),
+                    league,
+                    season,
+                    league_info,
+                    race,
+                    store.keys("laps", league, season_id, race),
                 )
-            )
 
-        _write_file(
-            templates["season.html"].render(
-                season=Season(season_races, season["season"]),
-                league=league_info,
-                races=[x["race"] for x in season["races"]],
-            ),
-            os.path.join(
+        if build.changed(
+                os.path.join(
+                    base_path,
+                    "seasons",
+                    "{}.html".format(season_id),
+                ),
+                inputs + [
+                    ("races", league, season_id),
+                    ("laps", league, season_id),
+                ]):
+            renderer.submit(
+                _write_season,
+                store,
                 base_path,
-                "seasons",
-                "{}.html".format(season["season"]["league_season_id"]),
+                league,
+                season,
+                league_info,
+                races,
             )
-        )
 
 
 def _league_info(leagues: list, league: int) -> dict:
@@ -256,42 +508,132 @@ def _league_info(leagues: list, league: int) -> dict:
     return {}
 
 
-def _write_templates(args: dict, data: dict) -> None:
-    """Write the data-formatted templates to the output path."""
+def _write_templates(args: dict) -> Counter:
+    """Write the data-formatted templates to the output path.
 
-    templates = _get_templates()
-    _write_file(
-        templates["style.css"].render(),
-        os.path.join(args["paths"]["output"], "style.css"),
-    )
-    _write_file(
-        templates["index.html"].render(leagues=data["leagues"]),
-        os.path.join(args["paths"]["output"], "index.html"),
-    )
+    Data is read one league, then one season at a time as it's written, so
+    only the largest season needs to fit in memory, not the whole history.
+    Pages are only written if their inputs changed since the last build when
+    --incremental is used. The build file is saved once all pages are written.
 
-    for league, _data in data["data"].items():
-        base_path = os.path.join(args["paths"]["output"], str(league))
-        league_info = _league_info(data["leagues"], league)
-        _write_file(
-            templates["league.html"].render(
-                league=league_info,
-                seasons=[x["season"] for x in _data["seasons"]],
+    Returns:
+        Counter of written file statuses, "new", "updated" or "unchanged"
+    """
+
+    output_path = args["paths"]["output"]
+    precompress = _precompress_extensions(args["--precompress"])
+    build = Build(
+        args["store"],
+        output_path,
+        # pages are rebuilt when the compressed copies written change
+        "{}{}".format(
+            templates_hash(
+                os.path.join(os.path.dirname(__file__), "templates")
             ),
-            os.path.join(
-                args["paths"]["output"],
+            "".join(precompress),
+        ),
+        args["--incremental"],
+    )
+
+    leagues = _read_data(args, "leagues")
+    with _Renderer(args["--jobs"], precompress) as renderer:
+        templates = _TEMPLATES
+        path = os.path.join(output_path, "style.css")
+        if build.changed(path, []):
+            renderer.written[_write_file(
+                templates["style.css"].render(),
+                path,
+            )] += 1
+
+        path = os.path.join(output_path, "index.html")
+        if build.changed(path, [("leagues", )]):
+            renderer.written[_write_file(
+                templates["index.html"].render(leagues=leagues),
+                path,
+            )] += 1
+
+        for league in args["leagues"]:
+            base_path = os.path.join(output_path, str(league))
+            league_info = _league_info(leagues, league)
+            members = _read_data(args, "members", league)
+            seasons = _read_data(args, "seasons", league)
+            league_inputs = [("leagues", league)]
+
+            path = os.path.join(
+                output_path,
                 "{}.html".format(league_info["leagueid"]),
-            ),
-        )
-        _write_members(templates, base_path, _data["members"], league_info)
-        _write_seasons(templates, base_path, _data["seasons"], league_info)
+            )
+            if build.changed(
+                    path,
+                    league_inputs + [("seasons", league)],
+            ):
+                renderer.written[_write_file(
+                    templates["league.html"].render(
+                        league=league_info,
+                        seasons=seasons,
+                    ),
+                    path,
+                )] += 1
+
+            _make_missing(os.path.join(base_path, "members"))
+            pages = {member["custID"] for member in members if (
+                build.changed(
+                    os.path.join(
+                        base_path,
+                        "members",
+                        "{}.html".format(member["custID"]),
+                    ),
+                    league_inputs + [("members", league, member["custID"])],
+                )
+            )}
+            listing = build.changed(
+                os.path.join(base_path, "members.html"),
+                league_inputs + [("members", league)],
+            )
+            if pages or listing:
+                renderer.submit(
+                    _write_members,
+                    base_path,
+                    members,
+                    league_info,
+                    pages,
+                    listing,
+                )
+
+            _write_seasons(
+                renderer,
+                build,
+                args,
+                base_path,
+                league,
+                seasons,
+                league_info,
+            )
+
+    build.save()
+    return renderer.written
 
 
 def main():
     """Command line entry point."""
 
     args = get_args(__doc__)
+
+    try:
+        args["--jobs"] = int(args["--jobs"])
+    except ValueError:
+        raise SystemExit("Invalid value for --jobs: {}".format(args["--jobs"]))
+    if args["--jobs"] < 1:
+        raise SystemExit("Invalid value for --jobs: {}".format(args["--jobs"]))
+
     _ensure_paths(args)
-    _write_templates(args, _read_json(args))
+    written = _write_templates(args)
+    print("Wrote {} new, {} updated and {} unchanged files to {}".format(
+        written["new"],
+        written["updated"],
+        written["unchanged"],
+        args["paths"]["output"],
+    ))
 
 
 if __name__ == "__main__":
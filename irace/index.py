@@ -0,0 +1,86 @@
+"""Index of an irace-populate results tree.
+
+The tree is walked once with os.scandir, mapping the IDs in each category to
+the JSON files below them, so readers don't each glob the filesystem::
+
+    leagues/<league>.json
+    members/<league>/<member>.json
+    seasons/<league>/<season>.json
+    races/<league>/<season>/<race>.json
+    laps/<league>/<season>/<race>/<member>.json
+
+Files may also be compressed, .json.gz or .json.zst, see `compression`.
+"""
+
+
+import os
+
+from .compression import strip_extension
+
+
+def _parse_id(name: str, path: str) -> int:
+    """Return the integer ID from the file or directory name."""
+
+    try:
+        return int(name)
+    except ValueError:
+        raise ValueError("Invalid path in results: {}".format(path))
+
+
+def _scan(path: str, depth: int) -> dict:
+    """Return the nested dictionary of IDs to JSON file paths below path."""
+
+    tree = {}
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
+        return tree
+
+    with entries:
+        for entry in entries:
+            if depth == 1:
+                name = strip_extension(entry.name)
+                if name is not None and entry.is_file():
+                    tree[_parse_id(name, entry.path)] = entry.path
+            elif entry.is_dir():
+                tree[_parse_id(entry.name, entry.path)] = _scan(
+                    entry.path,
+                    depth - 1,
+                )
+
+    return dict(sorted(tree.items()))
+
+
+class ResultsIndex:
+    """IDs and JSON file paths of a results tree, by category.
+
+    IDs passed to the lookup methods are ints, or None to match any ID.
+    """
+
+    # number of IDs in the path to each category's files
+    DEPTHS = {
+        "leagues": 1,
+        "members": 2,
+        "seasons": 2,
+        "races": 3,
+        "laps": 4,
+    }
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tree = {
+            category: _scan(os.path.join(path, category), depth)
+            for category, depth in self.DEPTHS.items()
+        }
+
+    def find(self, category: str, *ids: int) -> list:
+        """Return a list of (IDs, node) below the category matching ids."""
+
+        found = [((), self.tree[category])]
+        for _id in ids:
+            found = [
+                (path + (key, ), child)
+                for path, node in found if isinstance(node, dict)
+                for key, child in node.items() if _id is None or key == _id
+            ]
+        return found
@@ -11,6 +11,10 @@ Options:
     --debug              enable debug output
     --user=<user>        iRacing.com username
     --passwd=<passwd>    iRacing.com password (insecure, better to be prompted)
+    --session=<path>     file to save and reuse iRacing.com logins from
+                         (irace/session.json in $XDG_CACHE_HOME or ~/.cache)
+    --no-session         always login, without saving the session
+    --cache=<path>       cache responses in this directory (or .db file)
 """
 
 
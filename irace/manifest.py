@@ -0,0 +1,194 @@
+"""Sync manifest for irace-populate.
+
+Records what has been fetched for each league, season and subsession so that
+populate only needs to request what is missing or has changed. Lap data is
+tracked per driver group, so an interrupted race resumes where it stopped.
+Completed laps are appended to a journal next to the manifest as they happen,
+rather than rewriting the whole manifest for each driver, and are merged in
+when the manifest is next loaded. Drivers without any laps are retried a
+few times, spaced out over the following days, in case iRacing was late to
+publish them.
+
+Layout of the manifest JSON::
+
+    {"leagues": {league_id: {
+        "fetched": unix time, "hash": content hash,
+        "seasons": {season_id: {
+            "fetched": ..., "hash": ...,
+            "races": {sub_session_id: {
+                "fetched": ..., "hash": ...,
+                "event": content hash of the calendar event,
+                "laps": {group_id: {
+                    "custid": id, "complete": bool,
+                    "empty": times fetched without laps, "fetched": ...,
+                }},
+            }},
+        }},
+    }}}
+"""
+
+
+import io
+import os
+import json
+import time
+import hashlib
+
+
+def content_hash(obj: object) -> str:
+    """Return a stable hash of the JSON serializable object."""
+
+    return hashlib.sha1(json.dumps(
+        obj,
+        sort_keys=True,
+        ensure_ascii=False,
+    ).encode("utf-8")).hexdigest()
+
+
+class Manifest:
+    """Persistent record of everything irace-populate has fetched."""
+
+    FILENAME = "manifest.json"
+
+    # times to fetch drivers without laps, and seconds between each attempt
+    EMPTY_ATTEMPTS = 3
+    EMPTY_RETRY = 24 * 60 * 60
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = {"leagues": {}}
+
+        self.journal_path = "{}.journal".format(path)
+
+        if os.path.isfile(path):
+            try:
+                with io.open(path, "r", encoding="utf-8") as open_manifest:
+                    self.data = json.load(open_manifest)
+            except ValueError as error:
+                raise SystemExit("Invalid manifest {}: {!r}".format(
+                    path,
+                    error,
+                ))
+
+        self._replay_journal()
+
+    def _replay_journal(self) -> None:
+        """Mark the laps completed since the last save."""
+
+        if not os.path.isfile(self.journal_path):
+            return
+
+        with io.open(self.journal_path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                fields = line.split()
+                if len(fields) not in (4, 5):
+                    continue  # partly written when interrupted
+                league_id, season_id, sub_session_id, group_id = fields[:4]
+                laps = self.race(league_id, season_id, sub_session_id).get(
+                    "laps",
+                    {},
+                )
+                if group_id in laps:
+                    try:
+                        fetched = int(fields[4]) if fields[4:] else None
+                    except ValueError:
+                        continue
+                    self._mark_laps(laps[group_id], fetched)
+
+    @staticmethod
+    def _mark_laps(driver: dict, empty_fetched: int = None) -> None:
+        """Mark the driver's laps complete, or one more empty attempt."""
+
+        if empty_fetched is None:
+            driver["complete"] = True
+        else:
+            driver["empty"] = driver.get("empty", 0) + 1
+            driver["fetched"] = empty_fetched
+
+    def save(self) -> None:
+        """Write the manifest to disk, replacing the previous copy."""
+
+        temp_path = "{}.tmp".format(self.path)
+        with io.open(temp_path, "w", encoding="utf-8") as open_manifest:
+            json.dump(self.data, open_manifest, separators=(",", ":"))
+        os.replace(temp_path, self.path)
+
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def complete_laps(self, league_id: int, season_id: int,
+                      sub_session_id: int, group_id: int,
+                      empty: bool = False) -> None:
+        """Mark the driver group's laps fetched, in the journal too.
+
+        If empty, the laps were fetched without any data and are only
+        recorded as an attempt, see `pending_laps`.
+        """
+
+        fetched = int(time.time()) if empty else None
+        entry = self.race(league_id, season_id, sub_session_id)
+        self._mark_laps(entry["laps"][str(group_id)], fetched)
+        with io.open(self.journal_path, "a", encoding="utf-8") as journal:
+            journal.write("{} {} {} {}{}\n".format(
+                league_id,
+                season_id,
+                sub_session_id,
+                group_id,
+                "" if fetched is None else " {}".format(fetched),
+            ))
+
+    def league(self, league_id: int) -> dict:
+        """Return the manifest entry for the league."""
+
+        return self.data["leagues"].setdefault(str(league_id), {
+            "seasons": {},
+        })
+
+    def season(self, league_id: int, season_id: int) -> dict:
+        """Return the manifest entry for the season in the league."""
+
+        return self.league(league_id)["seasons"].setdefault(str(season_id), {
+            "races": {},
+        })
+
+    def race(self, league_id: int, season_id: int,
+             sub_session_id: int) -> dict:
+        """Return the manifest entry for the subsession in the season."""
+
+        return self.season(league_id, season_id)["races"].setdefault(
+            str(sub_session_id),
+            {},
+        )
+
+    @staticmethod
+    def record(entry: dict, obj: object) -> bool:
+        """Record a fetch of obj in the manifest entry.
+
+        Returns:
+            boolean True if the content differs from the last fetch
+        """
+
+        digest = content_hash(obj)
+        changed = entry.get("hash") != digest
+        entry["fetched"] = int(time.time())
+        entry["hash"] = digest
+        return changed
+
+    def pending_laps(self, entry: dict) -> dict:
+        """Return a dictionary of group ID to cust ID of laps not fetched.
+
+        Drivers last fetched without laps are only included again after
+        `EMPTY_RETRY` seconds, and at most `EMPTY_ATTEMPTS` times in total.
+        """
+
+        retry_before = time.time() - self.EMPTY_RETRY
+        return {
+            int(group_id): driver["custid"]
+            for group_id, driver in entry.get("laps", {}).items()
+            if not driver["complete"] and (
+                driver.get("empty", 0) == 0 or (
+                    driver["empty"] < self.EMPTY_ATTEMPTS and
+                    driver["fetched"] <= retry_before
+                )
+            )
+        }
@@ -1,10 +1,10 @@
 """Lap data parsing utilities."""
 
 
+from array import array
 from collections import namedtuple
 
-from .utils import time_string
-from .utils import as_timedelta
+from .utils import ticks_string
 
 
 Flag = namedtuple("Flag", ("name", "mask"))
@@ -22,46 +22,151 @@ FLAGS = (
     Flag("clock smash", 1024),
     Flag("tow", 2048),
 )
+FLAG_MASKS = {flag.name: flag.mask for flag in FLAGS}
+ALL_FLAGS = sum(FLAG_MASKS.values())
+INVALID = FLAG_MASKS["invalid"]
+CONTACT = FLAG_MASKS["contact"] | FLAG_MASKS["car contact"]
+
+# names of the flags set in each possible bitmask, eg FLAG_NAMES[6]
+FLAG_NAMES = tuple(
+    tuple(flag.name for flag in FLAGS if mask & flag.mask)
+    for mask in range(ALL_FLAGS + 1)
+)
+
+# times are in ticks, iRacing's 1/10000th seconds
+Summary = namedtuple("Summary", (
+    "total_time",
+    "total_valid_time",
+    "valid_laps",
+    "fast_lap",
+    "fastest_lap",
+    "fastest_driver",
+))
+
+
+def flag_names(flags: int) -> tuple:
+    """Return the names of the flags set in the bitmask."""
 
+    return FLAG_NAMES[flags & ALL_FLAGS]
 
-def _get_flags(flags: int) -> tuple:
-    """Return a tuple of applicable `Flag`s."""
 
-    flag_objs = []
-    for flag in FLAGS:
-        if flags & flag.mask:
-            flag_objs.append(flag)
+def count_flagged(flags, mask: int) -> int:
+    """Count the bitmasks in flags with any of the mask's flags set."""
 
-    return tuple(flag_objs)
+    return sum(1 for lap_flags in flags if lap_flags & mask)
 
 
 class Lap:
-    """Parsed lap object."""
+    """Parsed lap object, created from the `Laps` columns when needed."""
+
+    def __init__(self, lap: int, duration: int, flags: int):
+        self.flags = flags
+        self.flag_names = flag_names(flags)
+        self.lap = lap
+        self.time = duration  # in ticks
+
+    @property
+    def time_string(self) -> str:
+        """Lap time as a string."""
 
-    def __init__(self, data: dict, prev: int):
-        self.flags = _get_flags(data["flags"])
-        self.flag_names = tuple([x.name for x in self.flags])
-        self.lap = data["lap_num"]
-        self.time = as_timedelta(data["ses_time"] - prev)
+        return ticks_string(self.time)
 
 
 class Laps:
     """Parsed laps object.
 
     Instatiate with the loaded JSON return from `stats.Client.session_laps`.
+
+    Laps are held as parallel arrays of lap number, session time, lap
+    duration (both in iRacing's 1/10000th seconds) and flags bitmask, `Lap`
+    objects are only created when iterating `laps`. Lap statistics are
+    computed together on first use, see `summary`.
     """
 
+    __slots__ = (
+        "drivers",
+        "race",
+        "lap_numbers",
+        "session_times",
+        "durations",
+        "lap_flags",
+        "_summary",
+    )
+
     def __init__(self, data: dict):
         self.drivers = data["drivers"]
         self.race = data["header"]
 
-        laps = []
+        self.lap_numbers = array("i")
+        self.session_times = array("q")
+        self.durations = array("q")
+        self.lap_flags = array("i")
+        self._summary = None
+
         prev = 0
         for lap in data["lapData"]:
-            laps.append(Lap(lap, prev))
+            self.lap_numbers.append(lap["lap_num"])
+            self.session_times.append(lap["ses_time"])
+            self.durations.append(lap["ses_time"] - prev)
+            self.lap_flags.append(lap["flags"])
             prev = lap["ses_time"]
 
-        self.laps = tuple(laps)
+    @property
+    def laps(self) -> tuple:
+        """Tuple of `Lap` objects, built from the arrays on each access."""
+
+        return tuple(map(
+            Lap,
+            self.lap_numbers,
+            self.durations,
+            self.lap_flags,
+        ))
+
+    @property
+    def summary(self) -> Summary:
+        """Lap statistics, computed in one pass over the laps and drivers."""
+
+        if self._summary is None:
+            self._summary = self._summarize()
+        return self._summary
+
+    def _summarize(self) -> Summary:
+        """Compute the `Summary` of the laps and drivers."""
+
+        total_time = 0
+        valid_time = 0
+        valid_laps = 0
+        for number, duration, flags in zip(
+                self.lap_numbers, self.durations, self.lap_flags):
+            total_time += duration
+            if number != 0 and not flags & INVALID:  # lap 0 isn't timed
+                valid_time += duration
+                valid_laps += 1
+
+        best_lap_time = None
+        best_lap = -1
+        fastest_time = -1
+        fastest_driver = ""
+        for driver in self.drivers:
+            lap_time = driver["bestlaptime"]
+            if best_lap_time is None or lap_time < best_lap_time:
+                best_lap_time = lap_time
+                best_lap = driver["bestlapnum"]
+            if lap_time > 0 and (fastest_time < 0 or lap_time < fastest_time):
+                fastest_time = lap_time
+                fastest_driver = driver["displayname"]
+
+        return Summary(
+            total_time=total_time,
+            total_valid_time=valid_time,
+            valid_laps=valid_laps,
+            fast_lap=best_lap,
+            fastest_lap=(
+                best_lap_time
+                if best_lap_time is not None and best_lap_time > 0 else -1
+            ),
+            fastest_driver=fastest_driver,
+        )
 
     @property
     def average(self) -> float:
@@ -70,10 +175,10 @@ class Laps:
         If the return is < 0, there is no average time.
         """
 
-        total_lap_time, valid_laps = self._lap_totals()
+        summary = self.summary
 
-        if valid_laps:  # avoid divide by zero
-            return total_lap_time / valid_laps
+        if summary.valid_laps:  # avoid divide by zero
+            return summary.total_valid_time / summary.valid_laps / 10000.0
 
         return -1.0
 
@@ -81,7 +186,12 @@ class Laps:
     def average_string(self) -> str:
         """Average lap time, as a string."""
 
-        return time_string(self.average)
+        summary = self.summary
+
+        if summary.valid_laps:
+            return ticks_string(summary.total_valid_time // summary.valid_laps)
+
+        return ticks_string(-1)
 
     @property
     def fast_lap(self) -> int:
@@ -90,15 +200,7 @@ class Laps:
         If the return is < 0, there is no fast lap.
         """
 
-        best_lap_time = None
-        best_lap = -1
-
-        for driver in self.drivers:
-            if best_lap_time is None or driver["bestlaptime"] < best_lap_time:
-                best_lap_time = driver["bestlaptime"]
-                best_lap = driver["bestlapnum"]
-
-        return best_lap
+        return self.summary.fast_lap
 
     @property
     def fastest_lap(self) -> float:
@@ -107,14 +209,8 @@ class Laps:
         If the return is < 0, there is no fastest lap.
         """
 
-        best_lap_time = None
-
-        for driver in self.drivers:
-            if best_lap_time is None or driver["bestlaptime"] < best_lap_time:
-                best_lap_time = driver["bestlaptime"]
-
-        if best_lap_time > 0:
-            return as_timedelta(best_lap_time).total_seconds()
+        if self.summary.fastest_lap > 0:
+            return self.summary.fastest_lap / 10000.0
 
         return -1.0
 
@@ -122,86 +218,72 @@ class Laps:
     def fastest_lap_string(self) -> str:
         """Fastest lap time (in seconds) as a string."""
 
-        return time_string(self.fastest_lap)
+        return ticks_string(self.summary.fastest_lap)
 
     @property
     def total_time(self) -> float:
         """Total lap time of all laps."""
 
-        return sum(x.time.total_seconds() for x in self.laps)
+        return self.summary.total_time / 10000.0
 
     @property
     def total_time_string(self) -> str:
         """Total lap time of all laps as a string."""
 
-        return time_string(self.total_time)
+        return ticks_string(self.summary.total_time)
 
     @property
     def total_valid_time(self) -> float:
         """Total lap time of all valid laps."""
 
-        return self._lap_totals()[0]
+        return self.summary.total_valid_time / 10000.0
 
     @property
     def total_valid_time_string(self) -> str:
         """Total lap time of all valid laps as a string."""
 
-        return time_string(self.total_valid_time)
+        return ticks_string(self.summary.total_valid_time)
 
     @property
     def valid_laps(self) -> int:
         """Number of valid laps turned."""
 
-        return self._lap_totals()[1]
+        return self.summary.valid_laps
 
     @property
     def total_laps(self) -> int:
         """Number of totals laps turned."""
 
-        return len(self.laps)
+        return len(self.lap_numbers)
 
     @property
     def flagged_laps(self) -> dict:
         """Returns a dictionary of lap number to flag (by name)."""
 
-        incidents = {}
-        for lap in self.laps:
-            if lap.flags:
-                incidents[lap.lap] = tuple(x.name for x in lap.flags)
-        return incidents
+        return {
+            number: flag_names(flags)
+            for number, flags in zip(self.lap_numbers, self.lap_flags) if flags
+        }
 
-    def _lap_totals(self) -> (float, int):
-        """Sum the total lap time and count of valid laps."""
+    def count_flagged(self, *names: str) -> int:
+        """Count the laps with any of the flags, by name, set."""
 
-        total_lap_time = 0.0
-        valid_laps = 0
-        for lap in self.laps:
-            if lap.lap == 0:
-                continue
-            lap_is_valid = True
-            for flag in lap.flags:
-                if flag.mask == 1:  # invalid lap
-                    lap_is_valid = False
-                    break
-
-            if lap_is_valid:
-                valid_laps += 1
-                total_lap_time += lap.time.total_seconds()
+        mask = 0
+        for name in names:
+            mask |= FLAG_MASKS[name]
+        return count_flagged(self.lap_flags, mask)
+
+    @property
+    def contact_laps(self) -> int:
+        """Number of laps with contact, with a car or otherwise."""
 
-        return total_lap_time, valid_laps
+        return count_flagged(self.lap_flags, CONTACT)
 
     @property
     def fastest_driver(self) -> str:
         """Returns the name of the driver with the fastest lap."""
 
-        fastest_driver = ""
-        fastest_time = -1.0
-        for driver in self.drivers:
-            lap_time = driver["bestlaptime"]
-            if lap_time > 0 and (fastest_time < 0 or lap_time < fastest_time):
-                fastest_time = lap_time
-                fastest_driver = driver["displayname"]
-        return fastest_driver
+        return self.summary.fastest_driver
 
     @property
     def driver(self) -> str:
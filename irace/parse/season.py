@@ -1,7 +1,12 @@
 """Race data parsing utilities."""
 
 
-from collections import defaultdict
+from bisect import insort
+from bisect import bisect_left
+from collections import namedtuple
+
+
+StandingChange = namedtuple("StandingChange", ("driver", "old", "new"))
 
 
 def _incidents_per_corner(race: dict, result: dict) -> float:
@@ -81,33 +86,91 @@ class Driver:  # pylint: disable=R0902
 
 
 class Leaderboard:
-    """Simple leaderboard."""
+    """Season leaderboard, updated incrementally as races are added.
+
+    Drivers are kept sorted by points, ties in the order they were first
+    seen, so adding a race only moves the drivers in it. Standings are
+    cached until the next race is added.
+    """
 
     def __init__(self):
-        self._drivers = defaultdict(Driver)
-        self._races = []
+        self._drivers = {}
+        self._races = set()
+        self._ranking = []  # sorted (-points, first seen, driver ID)
+        self._keys = {}  # driver ID to their key in _ranking
+        self._standings = None
+
+    def add(self, race, delta: bool = False) -> list:
+        """Add a race to the board.
+
+        Args:
+            race: Race object to add
+            delta: boolean to return the changes in standings
 
-    def add(self, race):
-        """Add a race to the board."""
+        Returns:
+            list of `StandingChange` of drivers who moved, if delta
+        """
 
         if race.race["subsessionid"] in self._races:
             raise ValueError("Race {} already in leaderboard".format(
                 race.race["subsessionid"]
             ))
-        self._races.append(race.race["subsessionid"])
 
+        previous = {}
+        if delta:
+            previous = {x.driver_id: x.position for x in self.standings}
+
+        self._races.add(race.race["subsessionid"])
         for result in race.results:
-            self._drivers[result["custid"]].add(race.race, result)
+            self._add_result(race.race, result)
+        self._standings = None
+
+        if not delta:
+            return None
+
+        return [
+            StandingChange(driver, previous.get(driver.driver_id, -1),
+                           driver.position)
+            for driver in self.standings
+            if previous.get(driver.driver_id) != driver.position
+        ]
+
+    def _add_result(self, race: dict, result: dict) -> None:
+        """Add the result to the driver and move them in the ranking."""
+
+        driver_id = result["custid"]
+        if driver_id in self._drivers:
+            driver = self._drivers[driver_id]
+            key = self._keys[driver_id]
+            del self._ranking[bisect_left(self._ranking, key)]
+        else:
+            driver = self._drivers[driver_id] = Driver()
+            key = (0, len(self._drivers), driver_id)
+
+        driver.add(race, result)
+        key = (-driver.points, ) + key[1:]
+        self._keys[driver_id] = key
+        insort(self._ranking, key)
 
     @property
     def standings(self) -> list:
-        """Returns an ordered list of driver season standings."""
+        """Returns an ordered list of driver season standings.
+
+        Drivers with the same points share the position.
+        """
+
+        if self._standings is None:
+            self._standings = []
+            for i, key in enumerate(self._ranking, 1):
+                driver = self._drivers[key[-1]]
+                if self._standings and \
+                        self._standings[-1].points == driver.points:
+                    driver.position = self._standings[-1].position
+                else:
+                    driver.position = i
+                self._standings.append(driver)
 
-        return sorted(
-            self._drivers.values(),
-            key=lambda x: x.points,
-            reverse=True,
-        )
+        return self._standings
 
 
 class Season:
@@ -127,17 +190,4 @@ class Season:
     def standings(self) -> list:
         """Return a list of driver standings for the season."""
 
-        drivers = self.leaderboard.standings
-
-        previous_points = -1
-        previous_position = -1
-
-        for i, driver in enumerate(drivers, 1):
-            if driver.points == previous_points:
-                driver.position = previous_position
-            else:
-                driver.position = i
-                previous_position = i
-            previous_points = driver.points
-
-        return drivers
+        return self.leaderboard.standings
@@ -1,47 +1,34 @@
-"""Generic parsing utilities."""
+"""Generic parsing utilities.
 
-
-from datetime import timedelta
-
-
-def as_timedelta(timestamp: float) -> timedelta:
-    """Convert whatever timestamps iRacing is using into standard."""
-
-    # NB: not microseconds nor milliseconds, unfortunately
-    return timedelta(seconds=timestamp / 10000.0)
-
-
-def time_string(timestamp) -> str:
-    """Convert the timestamp to a decent looking time string."""
-
-    if isinstance(timestamp, timedelta):
-        return _format_seconds(timestamp.total_seconds())
-    return _format_seconds(timedelta(seconds=timestamp).total_seconds())
+iRacing times are in ticks, 1/10000th seconds, and are kept as integers.
+"""
 
 
 def time_string_raw(timestamp) -> str:
     """Convert iRacing timestamp to string."""
 
-    return time_string(timestamp / 10000.0)
+    return ticks_string(int(timestamp))
 
 
-def _format_seconds(seconds: float) -> str:
-    """Format the total number of seconds into a time string."""
+def ticks_string(ticks: int) -> str:
+    """Format iRacing's 1/10000th seconds as a time string.
 
-    if seconds <= 0:
-        return "--:--"
+    Integer only, so this is exact, without float or timedelta conversions.
+    """
 
-    hours, remaining = divmod(seconds, 3600)
-    minutes, remaining = divmod(remaining, 60)
-    seconds, microseconds = divmod(remaining, 1)
+    if ticks <= 0:
+        return "--:--"
 
-    timestr = "{:02}:{:02}.{:04}".format(
-        int(minutes),
-        int(seconds),
-        int(microseconds * 10000)
-    )
+    seconds, fraction = divmod(ticks, 10000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
 
     if hours:
-        return "{:02}:{}".format(int(hours), timestr)
-
-    return timestr
+        return "{:02}:{:02}:{:02}.{:04}".format(
+            hours,
+            minutes,
+            seconds,
+            fraction,
+        )
+
+    return "{:02}:{:02}.{:04}".format(minutes, seconds, fraction)
@@ -8,6 +8,10 @@ Options:
     --version            display version information
     --debug              enable debug output
     --file <FILE>        filepath to lap JSON data (or use stdin)
+    --race <ID>          race ID to read the driver's laps of from the input
+    --driver <ID>        driver ID to read the laps of from the input
+    --input <PATH>       JSON input directory, or sqlite:<path>
+                         [default: results]
 """
 
 
@@ -16,12 +20,43 @@ import json
 
 from .utils import get_args
 from .utils import read_json
+from .store import open_store
 from .parse.laps import Laps
 
 
+def _get_stored(args) -> dict:
+    """Returns the lap JSON data of the driver in the race from the input."""
+
+    try:
+        race_id = int(args["--race"])
+        driver_id = int(args["--driver"])
+    except ValueError:
+        raise SystemExit("invalid --race or --driver ID")
+
+    try:
+        store = open_store(args["--input"], create=False)
+        keys = store.find("laps", None, None, race_id, driver_id)
+    except FileNotFoundError:
+        raise SystemExit("Input path {} does not exist".format(
+            args["--input"]
+        ))
+    except ValueError as error:
+        raise SystemExit(error)
+
+    if len(keys) != 1:
+        raise SystemExit("Unable to load laps of {} in race {}".format(
+            driver_id,
+            race_id,
+        ))
+    return store.load("laps", *keys[0])
+
+
 def _get_json(args) -> dict:
     """Returns the loaded lap JSON data."""
 
+    if args["--race"] and args["--driver"]:
+        return _get_stored(args)
+
     if args["--file"] and os.path.isfile(args["--file"]):
         return read_json(args["--file"])
 
@@ -59,12 +94,15 @@ def main():
     times = []
     for lap in laps.laps:
         lap_time = lap.time_string
-        if lap.flags:
-            lap_time += " [{}]".format(", ".join(x.name for x in lap.flags))
+        if lap.flag_names:
+            lap_time += " [{}]".format(", ".join(lap.flag_names))
         times.append(("Lap {}".format(lap.lap), lap_time))
 
     print("Parsed lap JSON {}:\n{}\n{}\n{}".format(
-        args["--file"] or "from STDIN",
+        args["--file"] or (
+            "of {} in race {}".format(args["--driver"], args["--race"])
+            if args["--race"] and args["--driver"] else "from STDIN"
+        ),
         "\n".join("  {}: {}".format(x[0], x[1]) for x in data),
         "  {stars} Laps {stars}".format(stars="*" * 10) if times else "",
         "\n".join("  {}: {}".format(x[0], x[1]) for x in times),
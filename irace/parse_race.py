@@ -11,88 +11,101 @@ Options:
     --list               list available race IDs
     --list-seasons       list available season IDs
     --race <ID>          race ID to parse
-    --input <PATH>       JSON input directory [default: results]
+    --input <PATH>       JSON input directory, or sqlite:<path>
+                         [default: results]
     --league <ID>        limit races to a league by ID
     --season <ID>        limit races to a season by ID
     --all                aggregate all races in the season
 """
 
 
-import os
-from glob import glob
-
 from .utils import get_args
-from .utils import read_json
+from .store import Store
+from .store import open_store
 from .parse import Laps
 from .parse import Race
 from .parse import Season
 
 
-def _laps_path(args: dict, race_id: int = 0) -> str:
-    """Return the filepath to the laps JSON."""
+def _store(args: dict) -> Store:
+    """Return the store of the input results, opening it the first time."""
+
+    if "store" not in args:
+        try:
+            args["store"] = open_store(args["--input"], create=False)
+        except FileNotFoundError:
+            raise SystemExit("Input path {} does not exist".format(
+                args["--input"]
+            ))
+    return args["store"]
+
+
+def _find(args: dict, category: str, *ids: int) -> list:
+    """Return the matching ID tuples of the category in the store."""
+
+    try:
+        return _store(args).find(category, *ids)
+    except ValueError as error:
+        raise SystemExit(error)
+
+
+def _filters(args: dict) -> tuple:
+    """Return the league and season IDs to limit results to, or None."""
+
+    filters = []
+    for arg in ("--league", "--season"):
+        try:
+            filters.append(int(args[arg]) if args[arg] else None)
+        except ValueError:
+            raise SystemExit("invalid {} ID".format(arg))
+    return tuple(filters)
 
-    return os.path.join(
-        args["--input"],
-        "laps",
-        args["--league"] or "*",
-        args["--season"] or "*",
-        *[str(race_id), "*"] if race_id else ["*"],
-    )
+
+def _lap_keys(args: dict, race_id: int) -> list:
+    """Return the ID tuples of the laps of the race."""
+
+    return _find(args, "laps", *_filters(args), race_id, None)
 
 
 def _available_races(args: dict) -> list:
     """Return a list of available races by ID."""
 
-    return [int(os.path.split(x)[1]) for x in glob(_laps_path(args))]
+    return sorted({
+        ids[-1] for ids in _find(args, "laps", *_filters(args), None)
+    })
 
 
 def _available_seasons(args: dict) -> list:
     """Return a list of available seasons by ID."""
 
-    return [int(os.path.split(x)[1]) for x in glob(os.path.join(
-        args["--input"],
-        "laps",
-        args["--league"] or "*",
-        args["--season"] or "*",
-    ))]
+    return [ids[-1] for ids in _find(args, "laps", *_filters(args))]
 
 
 def _get_laps(args: dict, race_id: int) -> list:
     """Return a list of Laps objects for the given race ID."""
 
     laps = []
-    for filepath in glob(_laps_path(args, race_id)):
-        laps.append(Laps(read_json(filepath)))
+    for key in _lap_keys(args, race_id):
+        laps.append(Laps(_store(args).load("laps", *key)))
     return laps
 
 
 def _get_race_data(args: dict, race_id: int) -> dict:
-    """Load the race JSON from disk."""
-
-    files = glob(os.path.join(
-        args["--input"],
-        "races",
-        args["--league"] or "*",
-        args["--season"] or "*",
-        "{}.json".format(race_id),
-    ))
-    if len(files) != 1:
+    """Load the race JSON from the store."""
+
+    keys = _find(args, "races", *_filters(args), race_id)
+    if len(keys) != 1:
         raise SystemExit("Unable to load race data for {}".format(race_id))
-    return read_json(files[0])
+    return _store(args).load("races", *keys[0])
 
 
 def _get_season_data(args: dict, season_id: int) -> dict:
-    """Load the season JSON from disk."""
+    """Load the season JSON from the store."""
 
-    files = glob(os.path.join(
-        args["--input"],
-        "seasons",
-        args["--league"] or "*",
-        "{}.json".format(season_id),
-    ))
-    if len(files) != 1:
+    keys = _find(args, "seasons", _filters(args)[0], season_id)
+    if len(keys) != 1:
         raise SystemExit("Unable to load season data for {}".format(season_id))
-    return read_json(files[0])
+    return _store(args).load("seasons", *keys[0])
 
 
 def list_races(args: dict) -> None:
@@ -122,7 +135,19 @@ def list_seasons(args: dict) -> None:
 def detail_race(args: dict) -> None:
     """Print details about a race by loading a parsing object."""
 
-    race_id = args["--race"] or max(_available_races(args))
+    if args["--race"] is None:
+        available = _available_races(args)
+        if available:
+            args["--race"] = str(max(available))
+        else:
+            raise SystemExit("No race data found in {}".format(
+                args["--input"]
+            ))
+
+    try:
+        race_id = int(args["--race"])
+    except ValueError:
+        raise SystemExit("invalid --race ID")
     race = Race(_get_laps(args, race_id), _get_race_data(args, race_id))
     print("{}\n{}".format(
         race.race["track_name"],
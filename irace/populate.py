@@ -13,12 +13,23 @@ Options:
     --debug              enable debug output
     --user=<user>        iRacing.com username
     --passwd=<passwd>    iRacing.com password (insecure, better to be prompted)
+    --session=<path>     file to save and reuse iRacing.com logins from
+                         (irace/session.json in $XDG_CACHE_HOME or ~/.cache)
+    --no-session         always login, without saving the session
+    --cache=<path>       cache responses in this directory (or .db file)
     --club=<id>          iRacing.com club/league ID [default: 637]
     --car=<id>           car ID in the club to pull results from [default: -1]
     --year=<id>          year to pull results from [default: -1]
     --season=<id>        season to pull results from
     --week=<id>          week of season to pull results from [default: -1]
     --output=<path>      output directory [default: results]
+    --store=<store>      store results in an SQLite database instead of the
+                         output directory, as sqlite:<path>, which does not
+                         support --format
+    --format=<fmt>       output file format, json or minified and compressed
+                         as gz or zst, laps are always minified
+                         [default: json]
+    --jobs=<n>           lap requests to have in flight at once [default: 1]
     --league             populate basic information about the club/league
     --seasons            populate seasons for the club/league
     --members            populate members for the club/league
@@ -26,13 +37,16 @@ Options:
 """
 
 
-import io
-import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 from .stats import Client
 from .utils import get_args
 from .utils import get_client
+from .manifest import Manifest
+from .manifest import content_hash
+from .store import open_store
+from .compression import validate_format
 
 
 def _print_dict(data: dict) -> None:
@@ -48,13 +62,11 @@ def _print_dict(data: dict) -> None:
 def _success(args: dict, category: tuple, results: int) -> None:
     """Print the success message at app exit."""
 
-    out_dir = os.path.join(args["--output"], *category)
-
     if results:
         print("Wrote {:,d} result{} to: {}".format(
             results,
             "s" * int(results != 1),
-            out_dir,
+            args["store"].location(*category),
         ))
 
 
@@ -64,62 +76,16 @@ def _category(*args) -> tuple:
     return tuple(str(x) for x in args)
 
 
-def _output_path(args: dict, category: tuple, _id: str) -> str:
-    """Return the output file path for this object.
-
-    Side-effect, creates the directory structure if needed.
-    """
-
-    if category:
-        directory = os.path.join(args["--output"], *category)
-    else:
-        directory = args["--output"]
-
-    return os.path.join(_ensure_directory(directory), "{}.json".format(_id))
-
-
 def _output_exists(args: dict, category: tuple, _id: str) -> bool:
-    """Check if the output file exists locally with content."""
+    """Check if the result is stored with content."""
 
-    file_path = _output_path(args, category, _id)
-    return os.path.exists(file_path) and os.path.getsize(file_path) > 0
+    return args["store"].exists(*category, _id)
 
 
 def _write_result(args: dict, category: tuple, _id: str, obj: object) -> None:
-    """Write the result to file."""
-
-    file_path = _output_path(args, category, _id)
-
-    with io.open(file_path, "w", encoding="utf-8") as open_results:
-        open_results.write(json.dumps(
-            obj,
-            sort_keys=True,
-            indent=4,
-            ensure_ascii=False,
-        ))
-
+    """Write the result to the store."""
 
-def _ensure_directory(file_path: str) -> str:
-    """Ensures the directory at file_path exists.
-
-    Returns:
-        string absolute file_path
-    """
-
-    if not os.path.isabs(file_path):
-        file_path = os.path.abspath(file_path)
-
-    if os.path.exists(file_path) and not os.path.isdir(file_path):
-        raise SystemExit(
-            "Output directory {} already exists, as a file. Bailing.".format(
-                file_path
-            )
-        )
-
-    if not os.path.exists(file_path):
-        os.makedirs(file_path)
-
-    return file_path
+    args["store"].write(obj, *category, _id)
 
 
 def fetch_league(args: dict, client: Client) -> None:
@@ -129,6 +95,9 @@ def fetch_league(args: dict, client: Client) -> None:
     league = client.league_info(args["--club"])
     if league:
         _write_result(args, category, args["--club"], league)
+        manifest = args["manifest"]
+        manifest.record(manifest.league(args["--club"]), league)
+        manifest.save()
 
     _success(args, category, int(league is not None))
 
@@ -146,7 +115,12 @@ def fetch_seasons(args: dict, client: Client) -> list:
             _write_result(args, category, season["league_season_id"], season)
             results += 1
             season_ids.append(season["league_season_id"])
+            args["manifest"].record(args["manifest"].season(
+                args["--club"],
+                season["league_season_id"],
+            ), season)
 
+    args["manifest"].save()
     _success(args, category, results)
     return season_ids
 
@@ -176,8 +150,40 @@ def fetch_standings(args: dict, client: Client) -> None:
     print(results)
 
 
+def _race_entry(args: dict, category: tuple, event: dict) -> dict:
+    """Return the manifest entry for the calendar event's race.
+
+    Races written before the manifest existed are adopted from disk.
+    """
+
+    sub_session_id = event["subsessionid"]
+    entry = args["manifest"].race(args["--club"], args["--season"],
+                                  sub_session_id)
+
+    if not entry and _output_exists(args, category, sub_session_id):
+        session = args["store"].load(*category, sub_session_id)
+        laps_category = _category(
+            "laps",
+            args["--club"],
+            args["--season"],
+            sub_session_id,
+        )
+        args["manifest"].record(entry, session)
+        entry["event"] = content_hash(event)
+        entry["laps"] = {str(driver["groupid"]): {
+            "custid": driver["custid"],
+            "complete": _output_exists(args, laps_category, driver["custid"]),
+        } for driver in session["rows"]}
+
+    return entry
+
+
 def fetch_results(args: dict, client: Client) -> None:
-    """Main function to fetch unknown league results."""
+    """Main function to fetch unknown or changed league results.
+
+    Races already in the manifest are only fetched again if their calendar
+    event has changed, any missing lap data is always fetched.
+    """
 
     events = client.league_season_calendar(args["--club"], args["--season"])
 
@@ -188,37 +194,94 @@ def fetch_results(args: dict, client: Client) -> None:
 
         for event in events["rows"]:
             sub_session_id = event["subsessionid"]
-            if _output_exists(args, category, sub_session_id):
-                continue
+            entry = _race_entry(args, category, event)
 
-            session_result = client.session_results(sub_session_id)
-            if session_result:
-                _write_result(args, category, sub_session_id, session_result)
-                results += 1
-                _fetch_laps(args, client, session_result)
+            if entry.get("event") != content_hash(event):
+                session_result = client.session_results(sub_session_id)
+                if not session_result:
+                    continue
+
+                if args["manifest"].record(entry, session_result):
+                    _write_result(args, category, sub_session_id,
+                                  session_result)
+                    results += 1
+                    entry["laps"] = {str(driver["groupid"]): {
+                        "custid": driver["custid"],
+                        "complete": False,
+                    } for driver in session_result["rows"]}
+
+                entry["event"] = content_hash(event)
+                args["manifest"].save()
+
+            if args["manifest"].pending_laps(entry):
+                _fetch_laps(args, client, sub_session_id, entry)
 
         _success(args, category, results)
 
 
-def _fetch_laps(args: dict, client: Client, session: dict) -> None:
-    """Fetch laps for all drivers in the session."""
+def _fetch_driver_laps(args: dict, client: Client, category: tuple,
+                       sub_session_id: int, group_id: int,
+                       cust_id: int) -> bool:
+    """Stream the laps for a driver straight to the store.
 
-    _id = session["subsessionid"]
-    category = _category("laps", args["--club"], args["--season"], _id)
-    results = 0
+    Returns:
+        boolean True if any laps were written
+    """
 
-    fetched = []
-    for driver in session["rows"]:
-        if driver["groupid"] in fetched:
-            # the same driver will appear up to 3 times in rows, due
-            # to entries for practice, qualify and race...
-            continue
-        fetched.append(driver["groupid"])
+    return args["store"].stream(
+        lambda output: client.session_laps(
+            sub_session_id,
+            group_id,
+            output=output,
+        ),
+        *category,
+        cust_id,
+    )
 
-        laps = client.session_laps(_id, driver["groupid"])
-        if laps:
-            results += 1
-            _write_result(args, category, driver["custid"], laps)
+
+def _fetch_laps(args: dict, client: Client, sub_session_id: int,
+                entry: dict) -> None:
+    """Fetch laps for all drivers in the session not yet in the manifest.
+
+    Up to `--jobs` drivers are requested at once, the stats client still
+    rate limits when each request is started. The manifest is saved once
+    per race, each driver's laps are journaled as they complete, so an
+    interrupted race resumes at the next driver. Drivers without laps are
+    recorded as empty, and retried later a limited number of times.
+    """
+
+    category = _category("laps", args["--club"], args["--season"],
+                         sub_session_id)
+    results = 0
+
+    # the same driver will appear up to 3 times in the session rows, due
+    # to entries for practice, qualify and race, the manifest has each once
+    drivers = args["manifest"].pending_laps(entry)
+
+    try:
+        with ThreadPoolExecutor(max_workers=args["--jobs"]) as pool:
+            all_written = pool.map(
+                lambda group_id: _fetch_driver_laps(
+                    args,
+                    client,
+                    category,
+                    sub_session_id,
+                    group_id,
+                    drivers[group_id],
+                ),
+                drivers,
+            )
+            for group_id, written in zip(drivers, all_written):
+                results += int(written)
+                args["manifest"].complete_laps(
+                    args["--club"],
+                    args["--season"],
+                    sub_session_id,
+                    group_id,
+                    empty=not written,
+                )
+    finally:
+        args["manifest"].save()
 
     _success(args, category, results)
 
@@ -239,12 +302,15 @@ def validate_integer_arguments(args) -> None:
         args: docopt arguments dictionary, modifies integer keys
     """
 
-    for arg in ("--car", "--club", "--season", "--week", "--year"):
+    for arg in ("--car", "--club", "--season", "--week", "--year", "--jobs"):
         try:
             args[arg] = int(args[arg] or 0)
         except ValueError:
             raise SystemExit("Invalid value for {}: {}".format(arg, args[arg]))
 
+    if args["--jobs"] < 1:
+        raise SystemExit("Invalid value for --jobs: {}".format(args["--jobs"]))
+
 
 def main() -> None:
     """Command line entry point."""
@@ -252,7 +318,11 @@ def main() -> None:
     args = get_args(__doc__)
 
     validate_integer_arguments(args)
-    _ensure_directory(args["--output"])
+    args["store"] = open_store(
+        args.pop("--store") or args["--output"],
+        fmt=validate_format(args.pop("--format")),
+    )
+    args["manifest"] = Manifest(args["store"].manifest_path(Manifest.FILENAME))
 
     client = get_client(args)
     if args.pop("--league"):
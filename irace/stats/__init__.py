@@ -5,3 +5,4 @@ This code was initially forked from https://github.com/jeysonmc/ir_webstats
 
 
 from .client import Stats as Client  # noqa: F401
+from .async_client import AsyncStats as AsyncClient  # noqa: F401
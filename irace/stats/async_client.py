@@ -0,0 +1,403 @@
+"""Asyncio stats client.
+
+Mirrors the methods of `client.Stats` used for league results, but every
+request is a coroutine so many of them can be in flight from one event loop.
+Requires the optional aiohttp dependency (`pip install iRace[async]`).
+
+Requests are retried and cached like the sync client, but saved login
+sessions are not reused, every client logs in when it is entered.
+
+Usage::
+
+    async with AsyncStats(username, password) as client:
+        laps = await asyncio.gather(*[
+            client.session_laps(sub_session_id, group_id)
+            for group_id in group_ids
+        ])
+"""
+
+
+import json
+import time
+import random
+import asyncio
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from . import utils
+from .logger import log
+from .logger import set_log_level
+from .client import _Client
+from .limiter import retry_after
+from .constants import Pages
+from .constants import URLs
+from .constants import StringFields
+from .response_cache import ResponseCache
+
+
+class TokenBucket:
+    """Asyncio token bucket rate limiter.
+
+    Allows bursts of up to `capacity` requests, refilling at `rate` tokens
+    per second. The defaults match the delay used by the sync client.
+    Backoffs pause all requests, not only the one which is retried.
+    """
+
+    MAX_PAUSE = 30.0
+
+    def __init__(self, rate: float = 10.0, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        # created on first use, so it binds to the running event loop
+        self._lock = None
+
+    def _refill(self) -> None:
+        """Add the tokens earned since the last refill."""
+
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated) * self.rate,
+        )
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available, then take it."""
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def backoff(self, attempt: int, retry_after: float = None) -> float:
+        """Pause all requests after a failed one.
+
+        Args:
+            attempt: zero based number of the failed attempt
+            retry_after: seconds the server asked us to wait, if any
+
+        Returns:
+            float seconds all requests are paused for
+        """
+
+        if retry_after is None:
+            # exponential backoff with jitter, as the sync client
+            pause = min(self.MAX_PAUSE, 2 ** (attempt + 1) / self.rate)
+            pause *= random.uniform(0.5, 1.5)
+        else:
+            pause = retry_after
+
+        self._paused_until = max(
+            self._paused_until,
+            time.monotonic() + pause,
+        )
+        return pause
+
+
+class AsyncStats:
+    """Asyncio iRacing stats client.
+
+    Use as an async context manager, the login happens on enter and the
+    HTTP session is closed on exit.
+    """
+
+    def __init__(self, username: str, password: str, debug=False,
+                 limiter: TokenBucket = None,
+                 responses: ResponseCache = None):
+        """Create a new async stats client.
+
+        Args:
+            username: iRacing.com username
+            password: iRacing.com password
+            debug: boolean to enable debug logging
+            limiter: TokenBucket shared by all requests from this client
+            responses: ResponseCache to reuse responses from, if any
+        """
+
+        if aiohttp is None:
+            raise SystemExit("aiohttp is required for the asyncio client")
+
+        self.customer_id = 0
+        self.cache = utils.Listings()
+
+        self.debug = debug
+        set_log_level(self.debug)
+
+        self.limiter = limiter or TokenBucket()
+        self.responses = responses
+        self.cookies = aiohttp.CookieJar()
+        self._credentials = (username, password)
+        self._session = None
+
+    async def __aenter__(self):
+        try:
+            await self.login()
+        except BaseException:
+            await self.close()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def login(self) -> None:
+        """Open the HTTP session and log in to iRacing."""
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                cookie_jar=self.cookies,
+                timeout=aiohttp.ClientTimeout(total=10),
+            )
+
+        username, password = self._credentials
+        resp = await self._req(
+            URLs.LOGIN,
+            data={
+                "username": username,
+                "password": password,
+                "utcoffset": 300,
+                "todaysdate": "",
+            },
+            json_response=False,
+        )
+
+        if any("irsso_members" in cookie.key for cookie in self.cookies):
+            self.customer_id = utils.get_customer_id(resp)
+            self.cache.load(utils.get_listings(resp))
+        else:
+            raise SystemExit("Invalid login for: {}".format(username))
+
+    async def close(self) -> None:
+        """Close the HTTP session."""
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _req(self, url, data: dict = None, get=False,
+                   json_response=True):
+        """Create and send an HTTP request to iRacing.
+
+        Responses may be returned from, and are saved to, our response cache.
+        """
+
+        login = url == URLs.LOGIN
+        cacheable = self.responses is not None and not login
+
+        text = self.responses.get(url, data) if cacheable else None
+        if text is not None:
+            log.debug("Using cached response for %s: %r", url, data)
+            cacheable = False
+        else:
+            # everything but the login is a read, safe to retry
+            text = await self._send(url, data, get, retry=not login)
+
+        if not json_response:
+            if cacheable:
+                self.responses.set(url, data, text)
+            return text
+
+        result = json.loads(text)
+        if cacheable and result:
+            self.responses.set(url, data, text)
+
+        return result
+
+    async def _send(self, url, data: dict, get: bool, retry: bool) -> str:
+        """Send the HTTP request, retrying timeouts, 429 and 5xx responses.
+
+        Retries as many times as the sync client, honouring Retry-After.
+        """
+
+        for attempt in range(_Client.RETRIES + 1):
+            last_attempt = not retry or attempt == _Client.RETRIES
+            await self.limiter.acquire()
+
+            if (data is None) or get:
+                request = self._session.get(URLs.get(url), params=data)
+            else:
+                request = self._session.post(URLs.get(url), data=data)
+
+            try:
+                async with request as resp:
+                    if resp.status == 429 or resp.status >= 500:
+                        pause = self.limiter.backoff(
+                            attempt,
+                            retry_after(resp.headers.get("Retry-After")),
+                        )
+                        if not last_attempt:
+                            log.warning("%d for %s, retrying in %.1fs",
+                                        resp.status, url, pause)
+                            continue
+
+                    resp.raise_for_status()
+                    text = await resp.text()
+                    log.debug(
+                        "%s %s %d\nreq data: %r\nresp data: %r",
+                        resp.method,
+                        url,
+                        resp.status,
+                        None if url == URLs.LOGIN else data,
+                        text,
+                    )
+                    return text
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) \
+                    as error:
+                pause = self.limiter.backoff(attempt)
+                if last_attempt:
+                    raise
+                log.warning("%r for %s, retrying in %.1fs",
+                            error, url, pause)
+
+        return None  # pragma: no cover
+
+    async def session_results(self, sub_session_id: int) -> dict:
+        """Get the session (race) results."""
+
+        results = await self._req(
+            URLs.SESSION_RESULTS,
+            data={
+                "subsessionID": sub_session_id,
+                "custid": self.customer_id,
+            },
+        )
+
+        if results:
+            utils.format_strings(results)
+
+        return results
+
+    async def session_laps(self, sub_session_id, group_id):
+        """Return the laps for the given group_id (driver)."""
+
+        results = await self._req(
+            URLs.SESSION_LAPS,
+            data={
+                "subsessionid": sub_session_id,
+                "groupid": group_id,
+            },
+        )
+
+        if results:
+            utils.format_strings(
+                results,
+                StringFields.get(URLs.SESSION_LAPS),
+            )
+
+        return results
+
+    async def league_seasons(self, league_id):
+        """Returns the list of seasons in the league."""
+
+        return utils.format_league_seasons(await self._req(
+            URLs.LEAGUE_SEASONS,
+            data={"leagueID": league_id},
+        ))
+
+    async def league_members(self, league_id):
+        """Returns all members in a league (will paginate)."""
+
+        all_results = []
+        page = 1
+
+        while True:
+            results = await self._league_members(league_id, page=page)
+            all_results.extend(results)
+            page += 1
+            if len(results) < Pages.NUM_ENTRIES:
+                break
+
+        return all_results
+
+    async def _league_members(self, league_id, page=1):
+        """Returns the member list for a league."""
+
+        lower, upper = utils.page_bounds(page)
+        members = await self._req(
+            URLs.LEAGUE_MEMBERS,
+            data={
+                "leagueid": league_id,
+                "lowerBound": lower,
+                "upperBound": upper,
+            },
+        )
+
+        utils.format_strings(members)
+        return members
+
+    async def league_season_standings(self, league_id, season_id):
+        """Returns the standings for the given season in the league."""
+
+        return await self._req(
+            URLs.LEAGUE_SEASON_STANDINGS,
+            data={
+                "leagueID": league_id,
+                "leagueSeasonID": season_id,
+            },
+        )
+
+    async def league_season_team_standings(self, league_id, season_id):
+        """Returns the team standings for the season in the league."""
+
+        return await self._req(
+            URLs.LEAGUE_TEAM_STANDINGS,
+            data={
+                "leagueID": league_id,
+                "leagueSeasonID": season_id,
+            },
+        )
+
+    async def league_season_calendar(self, league_id, season_id):
+        """Returns the calendar of events for the league and season."""
+
+        return await self._req(
+            URLs.LEAGUE_SEASON_CALENDAR,
+            data={
+                "leagueID": league_id,
+                "leagueSeasonID": season_id,
+            },
+        )
+
+    async def _league_search(self, term):
+        """Requests the league directory with the search parameter."""
+
+        return utils.format_league_search(await self._req(
+            URLs.LEAGUE_SEARCH,
+            data={
+                "search": term,
+                "restrictToMember": 0,
+                "lowerbound": 1,
+                "upperbound": 33,
+            },
+        ))
+
+    async def league_search(self, phrase):
+        """Returns basic info about the league (by name)."""
+
+        for result in await self._league_search(phrase):
+            # XXX not sure if iRacing leagues are actually case-insensitive
+            if result["leaguename"].lower() == phrase.lower():
+                return result
+        return None
+
+    async def league_info(self, league_id):
+        """Returns basic info about the league by ID."""
+
+        for result in await self._league_search(league_id):
+            if result["leagueid"] == league_id:
+                return result
+        return None
@@ -3,31 +3,44 @@
 
 import json
 import atexit
+import logging
+import threading
 from urllib.parse import urlencode
 
 from requests import Session
 from requests import Request
 from requests import Response
-from requests_throttler import throttler
+from requests import exceptions
+from requests.adapters import HTTPAdapter
 
 from . import utils
 from . import search
+from . import stream
 from . import drivers
 from .logger import log
 from .logger import set_log_level
 from .constants import Pages
 from .constants import Charts
 from .constants import Sorting
+from .constants import Layouts
 from .constants import URLs
+from .constants import StringFields
+from .session import SessionCache
+from .response_cache import ResponseCache
+from .limiter import AdaptiveLimiter
+from .limiter import retry_after
 
 
 class ParsingOptions:
     """Options for parsing individual requests."""
 
-    def __init__(self, get=False, login=False, json_response=True):
+    def __init__(self, get=False, login=False, json_response=True,
+                 stream=False, unquote=False):
         self.get = get
         self.login = login
         self.json_response = json_response
+        self.stream = stream  # decode the JSON as it is received
+        self.unquote = unquote  # unquote strings while decoding
 
 
 class RequestOptions:
@@ -56,65 +69,175 @@ class RequestOptions:
 
 
 class _Client:
-    """Static client to manage the connection pool."""
+    """Static client to manage the connection pool and rate limiter."""
 
-    _client = None
+    _session = None
+    _workers = 1
+    limiter = AdaptiveLimiter()
+
+    TIMEOUT = 10
+    RETRIES = 5
 
     @staticmethod
-    def _get():
-        """Return and/or create the static throttled HTTP client."""
+    def _get() -> Session:
+        """Return and/or create the static HTTP session."""
 
-        if _Client._client is None:
-            throttler.logger.level = 40  # set log level to logging.ERROR
+        if _Client._session is None:
+            _Client._session = Session()
+            _Client._mount()
+            atexit.register(_Client.app_exit)
 
-            _Client._client = throttler.BaseThrottler(
-                name="client",
-                delay=0.1,
-                session=Session(),
-            )
-            _Client._client.start()
+        return _Client._session
 
-            atexit.register(_Client.app_exit)
+    @staticmethod
+    def _mount() -> None:
+        """Size the connection pool to the number of workers."""
 
-        return _Client._client
+        adapter = HTTPAdapter(pool_maxsize=max(_Client._workers, 10))
+        _Client._session.mount("https://", adapter)
+        _Client._session.mount("http://", adapter)
 
     @staticmethod
-    def send_request(request: Request) -> Response:
-        """Sends a request using our connection pool and rate limiter."""
+    def set_workers(workers: int) -> None:
+        """Set the number of requests expected in flight at once."""
 
-        response = _Client._get().submit(request)  # async
-        return response.get_response(timeout=10)  # sync (when timeout != 0)
+        _Client._workers = workers
+        if _Client._session is not None:
+            _Client._mount()
+
+    @staticmethod
+    def send_request(request: Request, retry: bool = True,
+                     stream: bool = False) -> Response:
+        """Sends a request using our connection pool and rate limiter.
+
+        Args:
+            request: the Request to send
+            retry: boolean to retry on timeouts, 429 and 5xx responses.
+                   Only use this for requests which are safe to repeat
+            stream: boolean to leave the response body unread
+
+        Returns:
+            the Response, which may still be an error after all retries
+        """
+
+        session = _Client._get()
+        prepared = session.prepare_request(request)
+
+        for attempt in range(_Client.RETRIES + 1):
+            last_attempt = not retry or attempt == _Client.RETRIES
+            _Client.limiter.wait()
+
+            try:
+                resp = session.send(
+                    prepared,
+                    timeout=_Client.TIMEOUT,
+                    stream=stream,
+                )
+            except (exceptions.Timeout, exceptions.ConnectionError) as error:
+                pause = _Client.limiter.backoff(attempt)
+                if last_attempt:
+                    raise
+                log.warning("%r for %s, retrying in %.1fs (%.2f req/s)",
+                            error, prepared.url, pause, _Client.limiter.rate)
+                continue
+
+            if resp.status_code == 429 or resp.status_code >= 500:
+                pause = _Client.limiter.backoff(
+                    attempt,
+                    retry_after(resp.headers.get("Retry-After")),
+                )
+                if last_attempt:
+                    return resp
+                resp.close()
+                log.warning("%d for %s, retrying in %.1fs (%.2f req/s)",
+                            resp.status_code, prepared.url, pause,
+                            _Client.limiter.rate)
+                continue
+
+            _Client.limiter.success()
+            return resp
+
+        return resp  # pragma: no cover
 
     @staticmethod
     def app_exit():
-        """Exit function to clean up the throttled client."""
+        """Exit function to clean up the HTTP session."""
 
-        if _Client._client is not None:
-            _Client._client.shutdown()
-            _Client._client = None
+        if _Client._session is not None:
+            _Client._session.close()
+            _Client._session = None
 
 
 class Stats:  # pylint: disable=R0904
     """iRacing stats client."""
 
-    def __init__(self, username: str, password: str, debug=False):
-        """Create a new stats client."""
+    def __init__(self, username: str, password: str, debug=False,
+                 workers=1, session: SessionCache = None,
+                 responses: ResponseCache = None,
+                 ask_password: callable = None):
+        """Create a new stats client.
+
+        Args:
+            username: iRacing.com username
+            password: iRacing.com password, or None to use ask_password
+            debug: boolean to enable debug logging
+            workers: number of requests expected in flight at once, requests
+                     are still started no faster than the rate limiter allows
+            session: SessionCache to reuse a previous login from, if any
+            responses: ResponseCache to reuse responses from, if any
+            ask_password: callable returning the password, called the first
+                          time we need to login without one. For eg; when
+                          a resumed session expires
+        """
 
         self.cookie = ""
         self.customer_id = 0
 
         self.debug = debug
         set_log_level(self.debug)
+        _Client.set_workers(workers)
 
-        self.cache = {
-            "tracks": {},
-            "cars": {},
-            "division": {},
-            "car_class": {},
-            "club": {},
-            "season": None,
-            "year_and_quarter": (None, None),
-        }
+        self.cache = utils.Listings()
+
+        self._credentials = (username, password)
+        self._ask_password = ask_password
+        self._login_lock = threading.Lock()
+        self.session = session
+        self.responses = responses
+
+        if not self._resume_session():
+            self._login()
+
+    def _resume_session(self) -> bool:
+        """Reuse the saved login session if there is one."""
+
+        if self.session is None:
+            return False
+
+        saved = self.session.load(self._credentials[0])
+        if saved is None:
+            return False
+
+        self.cookie = saved["cookie"]
+        self.customer_id = saved["customer_id"]
+        self._populate_cache(saved["listings"])
+        log.debug("Resumed session for customer %d", self.customer_id)
+        return True
+
+    def _login(self) -> None:
+        """Log in to iRacing, saving the session if we have a cache."""
+
+        username, password = self._credentials
+        self.cookie = ""
+
+        if not password and self._ask_password is not None:
+            password = self._ask_password()
+            self._credentials = (username, password)
+
+        if not password:
+            raise SystemExit("Password required to login as: {}".format(
+                username
+            ))
 
         resp = self._req(
             URLs.LOGIN,
@@ -131,30 +254,103 @@ class Stats:  # pylint: disable=R0904
 
         # can we please get a normal login procedure? thanks in advance...
         if "irsso_members" in self.cookie:
-            # new programmers look away, this is not how you do it
-            ind = resp.index("js_custid")
-            self.customer_id = int(resp[ind + 11: resp.index(";", ind)])
-
-            self._populate_cache(resp)
+            self.customer_id = utils.get_customer_id(resp)
+            listings = utils.get_listings(resp)
+            self._populate_cache(listings)
+            if self.session is not None:
+                self.session.save(username, self.cookie, self.customer_id,
+                                  listings)
         else:
             raise SystemExit("Invalid login for: {}".format(username))
 
+    @property
+    def request_rate(self) -> float:
+        """Current requests per second allowed by the rate limiter."""
+
+        return _Client.limiter.rate
+
     def __del__(self):
         """Standard destructor method."""
 
         _Client.app_exit()
         del self
 
-    def _req(self, url, data: dict = None, options: RequestOptions = None):
-        """Create and send an HTTP request to iRacing."""
+    def _req(self, url, data: dict = None, options: RequestOptions = None,
+             output=None):
+        """Create and send an HTTP request to iRacing.
+
+        Responses may be returned from, and are saved to, our response cache.
+        Streamed responses are decoded as they are received, unless they are
+        cacheable. If output is given the decoded JSON is written to it and
+        a boolean is returned, True if the response was not empty.
+        """
 
         if options is None:
             options = RequestOptions()
+        parsing = options.parsing
+
+        cacheable = self.responses is not None and not parsing.login
+
+        text = self.responses.get(url, data) if cacheable else None
+        if text is not None:
+            log.debug("Using cached response for %s: %r", url, data)
+            cacheable = False
+        elif parsing.stream and not cacheable:
+            with self._send(url, data, options, stream=True) as resp:
+                resp.raw.decode_content = True
+                if output is not None:
+                    return stream.copy(resp.raw, output, parsing.unquote,
+                                       StringFields.get(url))
+                return stream.load(resp.raw, parsing.unquote,
+                                   StringFields.get(url))
+        else:
+            text = self._send(url, data, options).text
 
+        if not parsing.json_response:
+            if cacheable:
+                self.responses.set(url, data, text)
+            return text
+
+        result = stream.loads(text, parsing.unquote, StringFields.get(url))
+        if cacheable and result:
+            self.responses.set(url, data, text)
+
+        if output is not None:
+            json.dump(result, output, ensure_ascii=False)
+            return bool(result)
+
+        return result
+
+    def _send(self, url, data: dict, options: RequestOptions,
+              stream: bool = False) -> Response:
+        """Send the HTTP request to iRacing, returning the response."""
+
+        # everything but the login is a read, safe to retry
+        retry = not options.parsing.login
+        cookie = self.cookie
         resp = _Client.send_request(
-            self._get_request(url, data=data, options=options)
+            self._get_request(url, data=data, options=options),
+            retry=retry,
+            stream=stream,
         )
 
+        if resp.status_code == 401 and not options.parsing.login:
+            # our (possibly resumed) session has expired, login and retry.
+            # Only the first worker to see the 401 logs in, the others
+            # wait for it and retry with the new cookie
+            resp.close()
+            with self._login_lock:
+                if self.cookie == cookie:
+                    log.debug("Unauthorized for %s, logging in again", url)
+                    if self.session is not None:
+                        self.session.clear(self._credentials[0])
+                    self._login()
+            resp = _Client.send_request(
+                self._get_request(url, data=data, options=options),
+                retry=retry,
+                stream=stream,
+            )
+
         resp.raise_for_status()
 
         if options.parsing.login and "Set-Cookie" in resp.headers:
@@ -164,7 +360,7 @@ class Stats:  # pylint: disable=R0904
                 # holy moly...
                 self.cookie += ";" + resp.request.headers["cookie"]
 
-        if not options.parsing.login:
+        if not options.parsing.login and log.isEnabledFor(logging.DEBUG):
             header = " ".join((
                 "*" * 15,
                 resp.request.method,
@@ -179,14 +375,11 @@ class Stats:  # pylint: disable=R0904
                 data,
                 resp.request.headers,
                 resp.headers,
-                resp.text,
+                "<streamed>" if stream else resp.text,
                 "*" * len(header),
             )
 
-        if options.parsing.json_response:
-            return json.loads(resp.text)
-
-        return resp.text
+        return resp
 
     def _get_request(self, url: str, data: dict,
                      options: RequestOptions) -> Request:
@@ -215,28 +408,15 @@ class Stats:  # pylint: disable=R0904
             headers=headers,
         )
 
-    def _populate_cache(self, response):
+    def _populate_cache(self, listings: dict):
         """Gets general information from iRacing service.
 
-        For eg; current tracks, cars, series, etc. Fills in self.cache.
+        For eg; current tracks, cars, series, etc. Fills in self.cache from
+        the raw listings returned by `utils.get_listings`, each is parsed
+        the first time it is used.
         """
 
-        items = {
-            "tracks": "TrackListing",
-            "cars": "CarListing",
-            "car_class": "CarClassListing",
-            "club": "ClubListing",
-            "season": "SeasonListing",
-            "division": "DivisionListing",
-            "year_and_quarter": "YearAndQuarterListing"
-        }
-
-        for item, key in items.items():
-            try:
-                self.cache[item] = utils.get_irservice_var(key, response)
-            except Exception as error:
-                log.error("Failed to parse %s: %r", item, error)
-                raise  # if this happens iRacing is probably down
+        self.cache.load(listings)
 
     @utils.untested
     def irating_chart(self, customer_id=None, category=Charts.ROAD):
@@ -301,13 +481,14 @@ class Stats:  # pylint: disable=R0904
         )
 
     @utils.untested
-    def driver_search(self, query=None, page=1):
+    def driver_search(self, query=None, page=1, layout=Layouts.DICTS):
         """Search for drivers using several search fields.
 
         Args::
 
             query: a `drivers.DriverSearch` instantiated object
             page: integer page to receive results from (default: 1)
+            layout: `constants.Layouts` of the results (default: DICTS)
 
         Returns:
             tuple of (results, total_pages)
@@ -320,12 +501,12 @@ class Stats:  # pylint: disable=R0904
             # magic number 29 is customer_id
             if int(res["d"]["r"][0]["29"]) == int(self.customer_id):
                 return (
-                    utils.format_results(res["d"]["r"][1:], res["m"]),
+                    utils.format_results(res["d"]["r"][1:], res["m"], layout),
                     res["d"]["32"]
                 )
 
             return (
-                utils.format_results(res["d"]["r"], res["m"]),
+                utils.format_results(res["d"]["r"], res["m"], layout),
                 res["d"]["32"]
             )
         except Exception as error:
@@ -334,12 +515,14 @@ class Stats:  # pylint: disable=R0904
         return {}, 0
 
     @utils.untested
-    def results_archive(self, customer_id=None, query=None, page=1):
+    def results_archive(self, customer_id=None, query=None, page=1,
+                        layout=Layouts.DICTS):
         """Search race results using various fields.
 
         Returns a tuple (results, total_results) so if you want all results
         you should request different pages (using page). Each page has 25
-        (Pages.NUM_ENTRIES) results max.
+        (Pages.NUM_ENTRIES) results max. Results are in the `layout` from
+        `constants.Layouts`.
         """
 
         data = search.post_data(query, customer_id or self.customer_id, page)
@@ -347,7 +530,7 @@ class Stats:  # pylint: disable=R0904
 
         if res["d"]:
             return (
-                utils.format_results(res["d"]["r"], res["m"]),
+                utils.format_results(res["d"]["r"], res["m"], layout),
                 res["d"]["46"]
             )
 
@@ -367,7 +550,7 @@ class Stats:  # pylint: disable=R0904
 
     @utils.untested
     def season_standings(self, season, season_options, sort_options=None,
-                         page=1):
+                         page=1, layout=Layouts.DICTS):
         """Search season standings using various fields.
 
         Args::
@@ -376,6 +559,7 @@ class Stats:  # pylint: disable=R0904
             season_options: an instantiated SeasonOptions object
             sort_options: SortOptions class if desired (optional)
             page: integer page to return (default 1)
+            layout: `constants.Layouts` of the results (default: DICTS)
 
         Returns:
             tuple (results, total_pages)
@@ -402,7 +586,7 @@ class Stats:  # pylint: disable=R0904
 
         if res["d"]:
             return (
-                utils.format_results(res["d"]["r"], res["m"]),
+                utils.format_results(res["d"]["r"], res["m"], layout),
                 res["d"]["27"]
             )
 
@@ -455,70 +639,50 @@ class Stats:  # pylint: disable=R0904
         )
 
     @utils.untested
-    def series_race_results(self, season, race_week):
+    def series_race_results(self, season, race_week, layout=Layouts.DICTS):
         """Gets races results of all races of season in specified raceweek."""
 
         res = self._req(
             URLs.SERIES_RACE_RESULTS,
             data={"seasonid": season, "raceweek": race_week}  # TODO no bounds?
         )
-        return utils.format_results(res["d"], res["m"])
+        return utils.format_results(res["d"], res["m"], layout)
 
     def session_results(self, sub_session_id: int) -> dict:
         """Get the session (race) results."""
 
-        results = self._req(
+        return self._req(
             URLs.SESSION_RESULTS,
             data={
                 "subsessionID": sub_session_id,
                 "custid": self.customer_id,
             },
+            options=RequestOptions(ParsingOptions(stream=True, unquote=True)),
         )
 
-        if results:
-            utils.format_strings(results)
-
-        return results
+    def session_laps(self, sub_session_id, group_id, output=None):
+        """Return the laps for the given group_id (driver).
 
-    def session_laps(self, sub_session_id, group_id):
-        """Return the laps for the given group_id (driver)."""
+        If output (a text file) is given the laps are written to it as they
+        are received instead, returning True if there were any.
+        """
 
-        results = self._req(
+        return self._req(
             URLs.SESSION_LAPS,
             data={
                 "subsessionid": sub_session_id,
                 "groupid": group_id,
             },
+            options=RequestOptions(ParsingOptions(stream=True, unquote=True)),
+            output=output,
         )
 
-        if results:
-            utils.format_strings(results)
-
-        return results
-
     def league_seasons(self, league_id):
         """Returns the list of seasons in the league."""
 
-        results = self._req(URLs.LEAGUE_SEASONS, data={"leagueID": league_id})
-        seasons = utils.format_results(
-            results["d"]["r"],
-            results["m"],
+        return utils.format_league_seasons(
+            self._req(URLs.LEAGUE_SEASONS, data={"leagueID": league_id})
         )
-        utils.format_strings(seasons)
-
-        for season in seasons:
-            season["custom_points_json"] = json.loads(
-                season["custom_points_json"]
-            )
-
-            for previous_race in season.get("previousrace", []):
-                if previous_race:
-                    utils.format_season_race(previous_race)
-
-            if season["nextrace"]:
-                utils.format_season_race(season["nextrace"])
-
-        return seasons
 
     def league_members(self, league_id):
         """Returns all members in a league (will paginate)."""
@@ -598,11 +762,7 @@ class Stats:  # pylint: disable=R0904
                 "upperbound": 33,
             },
         )
-        if raw and raw.get("d"):
-            res = utils.format_results(raw["d"]["r"], raw["m"])
-            utils.format_strings(res)
-            return res
-        return []
+        return utils.format_league_search(raw)
 
     def league_search(self, phrase):
         """Returns basic info about the league (by name)."""
@@ -61,6 +61,14 @@ class Events:
     ALL = (1, 2, 3, 4)
 
 
+class Layouts:
+    """Result layouts returned from `utils.format_results`."""
+
+    DICTS = "dicts"  # list of dictionaries, one per row
+    ROWS = "rows"  # list of namedtuples, one per row
+    COLUMNS = "columns"  # dictionary of column name to list of values
+
+
 class Official:
     """Event official vs unofficial classification."""
 
@@ -118,6 +126,49 @@ class URLs:
         return URLs.BASE + "/" + url
 
 
+class StringFields:
+    """Top level response keys holding encoded strings, by URL.
+
+    Everything outside these keys is known to be numeric and is skipped when
+    decoding strings. Responses from URLs not listed have every string value
+    decoded.
+    """
+
+    URLS = {
+        URLs.SESSION_LAPS: ("header", "drivers"),
+    }
+
+    @staticmethod
+    def get(url: str) -> tuple:
+        """Return the string fields for the URL slug, or None for all."""
+
+        return StringFields.URLS.get(url)
+
+
+class CacheTTL:
+    """Seconds to keep responses from each URL in the response cache."""
+
+    NEVER = 0
+    FOREVER = -1
+
+    # results and laps never change once a subsession is official, empty
+    # responses (the subsession isn't finished) are never cached
+    URLS = {
+        URLs.SESSION_RESULTS: FOREVER,
+        URLs.SESSION_LAPS: FOREVER,
+        URLs.LEAGUE_SEASON_CALENDAR: 600,
+        URLs.LEAGUE_SEASONS: 3600,
+        URLs.LEAGUE_MEMBERS: 3600,
+        URLs.LEAGUE_SEARCH: 86400,
+    }
+
+    @staticmethod
+    def get(url: str) -> int:
+        """Return the TTL for the URL slug."""
+
+        return CacheTTL.URLS.get(url, CacheTTL.NEVER)
+
+
 class Locations:
     """Locations, in case you need this for reasons."""
 
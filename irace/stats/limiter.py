@@ -0,0 +1,90 @@
+"""Adaptive rate limiting for the stats client."""
+
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+
+class AdaptiveLimiter:
+    """Thread safe limiter spacing out the start of each request.
+
+    The delay between requests shrinks a little after every healthy response,
+    down to `min_delay`, and doubles (up to `max_delay`) whenever iRacing
+    tells us to slow down or fails to respond. Backoffs pause all requests,
+    not only the one which is retried.
+    """
+
+    def __init__(self, delay: float = 0.1, min_delay: float = 0.05,
+                 max_delay: float = 30.0):
+        self.delay = delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Current requests per second."""
+
+        return 1.0 / self.delay
+
+    def wait(self) -> None:
+        """Block until the next request is allowed to start."""
+
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.delay
+
+        if start > now:
+            time.sleep(start - now)
+
+    def success(self) -> None:
+        """Speed up slightly after a healthy response."""
+
+        with self._lock:
+            self.delay = max(self.min_delay, self.delay * 0.9)
+
+    def backoff(self, attempt: int, retry_after: float = None) -> float:
+        """Slow down after a failed request.
+
+        Args:
+            attempt: zero based number of the failed attempt
+            retry_after: seconds the server asked us to wait, if any
+
+        Returns:
+            float seconds all requests are paused for
+        """
+
+        with self._lock:
+            self.delay = min(self.max_delay, self.delay * 2)
+            if retry_after is None:
+                # exponential backoff with jitter
+                pause = min(self.max_delay, self.delay * 2 ** attempt)
+                pause *= random.uniform(0.5, 1.5)
+            else:
+                pause = retry_after
+            self._next = max(self._next, time.monotonic() + pause)
+
+        return pause
+
+
+def retry_after(header: str) -> float:
+    """Parse the Retry-After header into seconds, or None."""
+
+    if not header:
+        return None
+
+    try:
+        return max(float(header), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+    return max(retry_at - time.time(), 0.0)
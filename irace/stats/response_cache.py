@@ -0,0 +1,149 @@
+"""Response caching for the stats client.
+
+Responses are stored by URL and request data, and expire per URL according to
+`constants.CacheTTL`. Two backends are available, a directory of JSON files or
+a single SQLite database, see `open_cache`.
+"""
+
+
+import io
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from abc import ABC
+from abc import abstractmethod
+
+from .constants import CacheTTL
+
+
+def cache_key(url: str, data: dict = None) -> str:
+    """Return the cache key for the request."""
+
+    return hashlib.sha1(json.dumps(
+        [url, data],
+        sort_keys=True,
+        default=str,
+    ).encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """Base response cache, subclasses implement the storage."""
+
+    def __init__(self, policies: dict = None):
+        self.policies = policies or CacheTTL.URLS
+
+    def ttl(self, url: str) -> int:
+        """Return how long to keep responses from the URL slug."""
+
+        return self.policies.get(url, CacheTTL.NEVER)
+
+    def get(self, url: str, data: dict = None) -> str:
+        """Return the cached response text, or None if missing or expired."""
+
+        ttl = self.ttl(url)
+        if ttl == CacheTTL.NEVER:
+            return None
+
+        cached = self._load(cache_key(url, data))
+        if cached is None:
+            return None
+
+        created, text = cached
+        if ttl != CacheTTL.FOREVER and created + ttl < time.time():
+            return None
+
+        return text
+
+    def set(self, url: str, data: dict, text: str) -> None:
+        """Cache the response text, if the URL is cacheable."""
+
+        if self.ttl(url) != CacheTTL.NEVER:
+            self._store(cache_key(url, data), url, time.time(), text)
+
+    @abstractmethod
+    def _load(self, key: str) -> (float, str):
+        """Return the (created, text) stored for key, or None."""
+
+    @abstractmethod
+    def _store(self, key: str, url: str, created: float, text: str) -> None:
+        """Store the response text for key."""
+
+
+class FileCache(ResponseCache):
+    """Response cache stored as one JSON file per response."""
+
+    def __init__(self, path: str, policies: dict = None):
+        super().__init__(policies)
+        self.path = path
+
+    def _path(self, key: str) -> str:
+        """Return the file path for key."""
+
+        return os.path.join(self.path, key[:2], "{}.json".format(key))
+
+    def _load(self, key: str) -> (float, str):
+        try:
+            with io.open(self._path(key), "r", encoding="utf-8") as cached:
+                entry = json.load(cached)
+        except (OSError, ValueError):
+            return None
+
+        return entry["created"], entry["text"]
+
+    def _store(self, key: str, url: str, created: float, text: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        temp_path = "{}.{}.tmp".format(path, threading.get_ident())
+        with io.open(temp_path, "w", encoding="utf-8") as cached:
+            json.dump({"url": url, "created": created, "text": text}, cached)
+        os.replace(temp_path, path)
+
+
+class SQLiteCache(ResponseCache):
+    """Response cache stored in a single SQLite database."""
+
+    def __init__(self, path: str, policies: dict = None):
+        super().__init__(policies)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url TEXT, created REAL, body TEXT)"
+        )
+        self._conn.commit()
+
+    def _load(self, key: str) -> (float, str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT created, body FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+    def _store(self, key: str, url: str, created: float, text: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, url, created, text),
+            )
+            self._conn.commit()
+
+
+def open_cache(path: str) -> ResponseCache:
+    """Open the response cache at path.
+
+    Paths ending in .db or .sqlite use SQLite, anything else is a directory.
+    """
+
+    path = os.path.expanduser(path)
+    if os.path.splitext(path)[1] in (".db", ".sqlite"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return SQLiteCache(path)
+
+    return FileCache(path)
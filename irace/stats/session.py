@@ -0,0 +1,91 @@
+"""Persisted login sessions.
+
+Logging in to iRacing downloads and scrapes the member home page, which takes
+seconds. The session cookie and the raw listings scraped from the home page
+are saved here so following clients can skip the login until it expires.
+"""
+
+
+import io
+import os
+import json
+import time
+
+from .logger import log
+
+
+class SessionCache:
+    """On-disk cache of login sessions, by username."""
+
+    # iRacing doesn't tell us how long the cookie is good for
+    TTL = 3600
+
+    def __init__(self, path: str = None, ttl: int = TTL):
+        self.path = os.path.expanduser(path or self.default_path())
+        self.ttl = ttl
+
+    @staticmethod
+    def default_path() -> str:
+        """Return the default session cache file path."""
+
+        return os.path.join(
+            os.getenv("XDG_CACHE_HOME") or os.path.join("~", ".cache"),
+            "irace",
+            "session.json",
+        )
+
+    def _read(self) -> dict:
+        """Read all sessions from disk."""
+
+        if not os.path.isfile(self.path):
+            return {}
+
+        try:
+            with io.open(self.path, "r", encoding="utf-8") as open_cache:
+                return json.load(open_cache)
+        except ValueError as error:
+            log.warning("Ignoring invalid session cache: %r", error)
+            return {}
+
+    def load(self, username: str) -> dict:
+        """Return the unexpired session for the username, or None."""
+
+        session = self._read().get(username)
+        if session and session["expires"] > time.time():
+            return session
+        return None
+
+    def save(self, username: str, cookie: str, customer_id: int,
+             listings: dict) -> None:
+        """Save the session for the username, replacing any previous."""
+
+        sessions = {
+            user: session for user, session in self._read().items()
+            if session["expires"] > time.time()
+        }
+        sessions[username] = {
+            "cookie": cookie,
+            "customer_id": customer_id,
+            "listings": listings,
+            "expires": time.time() + self.ttl,
+        }
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        # the cookie is as good as a password, keep it private
+        temp_path = "{}.tmp".format(self.path)
+        descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                             0o600)
+        with io.open(descriptor, "w", encoding="utf-8") as open_cache:
+            json.dump(sessions, open_cache)
+        os.replace(temp_path, self.path)
+
+    def clear(self, username: str) -> None:
+        """Forget the session for the username."""
+
+        sessions = self._read()
+        if sessions.pop(username, None) is not None:
+            with io.open(self.path, "w", encoding="utf-8") as open_cache:
+                json.dump(sessions, open_cache)
@@ -0,0 +1,174 @@
+"""Streaming JSON decoding of iRacing responses.
+
+Decodes responses incrementally from the socket, unquoting string values in
+the same pass (the job `utils.format_strings` does after the fact). Uses the
+optional ijson dependency (`pip install iRace[stream]`), without it the whole
+response is read before decoding, but still without keeping a decoded copy of
+the response text around.
+"""
+
+
+import json
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+from .utils import unquote
+from .utils import format_strings
+
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode  # pylint: disable=C0103
+
+
+def _unquote_pairs(pairs: list) -> dict:
+    """json object_pairs_hook to unquote all string values."""
+
+    return {
+        key: unquote(value) if isinstance(value, str) else value
+        for key, value in pairs
+    }
+
+
+def loads(text: str, unquote_strings: bool = True,
+          fields: tuple = None) -> object:
+    """Decode the JSON text, unquoting string values of objects if desired.
+
+    Args:
+        text: JSON text to decode
+        unquote_strings: boolean to unquote string values of objects
+        fields: top level keys to unquote inside of, or None for all
+
+    Returns:
+        the decoded JSON object
+    """
+
+    if not unquote_strings:
+        return json.loads(text)
+
+    if fields is None:
+        # can't know where an object is from the hook, only unquote all
+        return json.loads(text, object_pairs_hook=_unquote_pairs)
+
+    result = json.loads(text)
+    if isinstance(result, dict):
+        format_strings(result, fields)
+    return result
+
+
+def load(response, unquote_strings: bool = True,
+         fields: tuple = None) -> object:
+    """Decode the JSON from the binary file-like response.
+
+    Args:
+        response: binary file-like object, eg; `requests.Response.raw`
+        unquote_strings: boolean to unquote string values of objects
+        fields: top level keys to unquote inside of, or None for all
+
+    Returns:
+        the decoded JSON object
+    """
+
+    if ijson is None:
+        return loads(response.read(), unquote_strings, fields)
+
+    containers = []
+    keys = []
+
+    for event, value in ijson.basic_parse(response, use_float=True):
+        if event == "map_key":
+            keys[-1] = value
+            continue
+
+        if event in ("end_map", "end_array"):
+            keys.pop()
+            value = containers.pop()
+            if not containers:
+                return value
+            continue
+
+        if event == "start_map":
+            value = {}
+        elif event == "start_array":
+            value = []
+        elif event == "string" and unquote_strings and containers and \
+                isinstance(containers[-1], dict) and \
+                (fields is None or keys[0] in fields):
+            value = unquote(value)
+
+        if containers:
+            if isinstance(containers[-1], dict):
+                containers[-1][keys[-1]] = value
+            else:
+                containers[-1].append(value)
+        elif not isinstance(value, (dict, list)):
+            return value
+
+        if isinstance(value, (dict, list)):
+            containers.append(value)
+            keys.append(None)
+
+    raise ValueError("Incomplete JSON response")
+
+
+def copy(response, output, unquote_strings: bool = True,
+         fields: tuple = None) -> bool:
+    """Decode the JSON from the response, writing it to output as we go.
+
+    The full object is never held in memory when ijson is available.
+
+    Args:
+        response: binary file-like object, eg; `requests.Response.raw`
+        output: text file-like object to write compact JSON to
+        unquote_strings: boolean to unquote string values of objects
+        fields: top level keys to unquote inside of, or None for all
+
+    Returns:
+        boolean True if the response was not empty
+    """
+
+    if ijson is None:
+        loaded = load(response, unquote_strings, fields)
+        json.dump(loaded, output, ensure_ascii=False)
+        return bool(loaded)
+
+    # per open container, (is an object, has no items written yet)
+    containers = []
+    empty = True
+    top_key = None
+
+    for event, value in ijson.basic_parse(response, use_float=True):
+        if event in ("end_map", "end_array"):
+            output.write("}" if containers.pop()[0] else "]")
+            continue
+
+        if containers:
+            is_map, first = containers[-1]
+            if event == "map_key" or not is_map:
+                if not first:
+                    output.write(",")
+                containers[-1] = (is_map, False)
+                if len(containers) == 1:
+                    empty = False
+        elif event not in ("start_map", "start_array"):
+            empty = not value
+
+        if event == "map_key":
+            if len(containers) == 1:
+                top_key = value
+            output.write(_encode(value))
+            output.write(":")
+        elif event == "start_map":
+            output.write("{")
+            containers.append((True, True))
+        elif event == "start_array":
+            output.write("[")
+            containers.append((False, True))
+        elif event == "string" and unquote_strings and containers and \
+                containers[-1][0] and (fields is None or top_key in fields):
+            output.write(_encode(unquote(value)))
+        else:
+            output.write(_encode(value))
+
+    return not empty
@@ -5,11 +5,28 @@ import json
 import time
 
 from datetime import datetime
+from operator import itemgetter
 from functools import wraps
+from functools import lru_cache
+from collections import namedtuple
+from collections.abc import MutableMapping
 from urllib.parse import unquote_plus
 
 from .logger import log
 from .constants import Pages
+from .constants import Layouts
+
+
+# cache key: javascript variable name in the home page
+LISTINGS = {
+    "tracks": "TrackListing",
+    "cars": "CarListing",
+    "car_class": "CarClassListing",
+    "club": "ClubListing",
+    "season": "SeasonListing",
+    "division": "DivisionListing",
+    "year_and_quarter": "YearAndQuarterListing"
+}
 
 
 def untested(func):  # XXX remove me!
@@ -29,30 +46,127 @@ def untested(func):  # XXX remove me!
     return _untested
 
 
-def format_results(results, header):
-    """Re-arrange the results into a more manageable data structure."""
+@lru_cache(maxsize=64)
+def _row_type(names: tuple) -> type:
+    """Return the namedtuple type for rows with the column names."""
 
-    return [{header[k]: v for k, v in row.items()} for row in results]
+    return namedtuple("Row", names, rename=True)
 
 
-def format_strings(results: dict) -> None:
-    """Blindly clean all string values in the dictionary (recursive)."""
+def format_results(results, header, layout=Layouts.DICTS):
+    """Re-arrange the results into a more manageable data structure.
 
-    if isinstance(results, (list, tuple)):
-        for result in results:
-            format_strings(result)
-        return
+    The rows are keyed on column numbers, mapped to names by the header.
+    The mapping is built once per response from the first row. If any row
+    has other columns, the ROWS and COLUMNS layouts use every column seen,
+    in the order first seen, missing cells are None. DICTS rows only ever
+    have their own columns.
 
-    for key, value in results.items():
-        if isinstance(value, str):
-            # iRacing.com double plus encodes their strings...
-            # so um. just... go ahead and double undo that here
-            results[key] = unquote_plus(unquote_plus(results[key]))
-        elif isinstance(value, (list, tuple)):
-            for nested in value:
-                format_strings(nested)
-        elif isinstance(value, dict):
-            format_strings(value)
+    Args:
+        results: list of row dictionaries
+        header: dictionary of column number to column name
+        layout: one of `constants.Layouts`
+    """
+
+    if not results:
+        return {} if layout == Layouts.COLUMNS else []
+
+    columns = tuple(results[0])
+    if layout != Layouts.DICTS:
+        first = results[0].keys()
+        if any(row.keys() != first for row in results):
+            columns = tuple(dict.fromkeys(k for row in results for k in row))
+    names = tuple(header[k] for k in columns)
+
+    if len(columns) == 1:
+        def get_values(row):
+            """Single column itemgetter, returning a tuple."""
+            return (row[columns[0]],)
+    else:
+        get_values = itemgetter(*columns)
+
+    if layout == Layouts.COLUMNS:
+        try:
+            return dict(zip(names, map(list, zip(*map(get_values, results)))))
+        except KeyError:
+            return {
+                name: [row.get(column) for row in results]
+                for column, name in zip(columns, names)
+            }
+
+    if layout == Layouts.ROWS:
+        row_type = _row_type(names)
+        make_row = row_type._make
+    else:
+        def make_row(values):
+            """Zip the column names with the row values."""
+            return dict(zip(names, values))
+
+    formatted = []
+    for row in results:
+        if len(row) == len(columns):
+            try:
+                formatted.append(make_row(get_values(row)))
+                continue
+            except KeyError:
+                pass
+
+        if layout == Layouts.ROWS:
+            formatted.append(row_type._make(row.get(k) for k in columns))
+        else:
+            formatted.append({header[k]: v for k, v in row.items()})
+
+    return formatted
+
+
+def unquote(value: str) -> str:
+    """Decode an iRacing.com string value."""
+
+    # most values (numbers as strings, plain names) have nothing to decode
+    if "%" not in value and "+" not in value:
+        return value
+
+    # iRacing.com double plus encodes their strings...
+    # so um. just... go ahead and double undo that here
+    return unquote_plus(unquote_plus(value))
+
+
+def format_strings(results: dict, fields: tuple = None) -> None:
+    """Blindly clean all string values in the dictionary (recursive).
+
+    Args:
+        results: dictionary or list of dictionaries to clean in place
+        fields: top level keys to clean, from `constants.StringFields`,
+                or None to clean everything
+    """
+
+    if fields is None:
+        pending = [results]
+    else:
+        pending = []
+        for field in fields:
+            value = results.get(field)
+            if isinstance(value, str):
+                results[field] = unquote(value)
+            elif value is not None:
+                pending.append(value)
+
+    # walk with our own stack, wide lists of rows don't recurse
+    while pending:
+        results = pending.pop()
+
+        if isinstance(results, (list, tuple)):
+            pending.extend(
+                x for x in results if isinstance(x, (list, tuple, dict))
+            )
+            continue
+
+        for key, value in results.items():
+            if isinstance(value, str):
+                if "%" in value or "+" in value:
+                    results[key] = unquote(value)
+            elif isinstance(value, (list, tuple, dict)):
+                pending.append(value)
 
 
 def format_season_race(race: dict) -> None:
@@ -65,8 +179,168 @@ def format_season_race(race: dict) -> None:
     race["cars"] = json.loads(race["cars"])
 
 
-def get_irservice_var(key, resp, appear=1):
-    """Parse the value for a key from the text response."""
+def format_league_seasons(results: dict) -> list:
+    """Format the League Seasons return into a list of season dictionaries."""
+
+    seasons = format_results(results["d"]["r"], results["m"])
+    format_strings(seasons)
+
+    for season in seasons:
+        season["custom_points_json"] = json.loads(
+            season["custom_points_json"]
+        )
+
+        for previous_race in season.get("previousrace", []):
+            if previous_race:
+                format_season_race(previous_race)
+
+        if season["nextrace"]:
+            format_season_race(season["nextrace"])
+
+    return seasons
+
+
+def format_league_search(raw: dict) -> list:
+    """Format the League Directory return into a list of leagues."""
+
+    if raw and raw.get("d"):
+        res = format_results(raw["d"]["r"], raw["m"])
+        format_strings(res)
+        return res
+    return []
+
+
+def get_customer_id(resp: str) -> int:
+    """Parse the logged in customer ID from the home page response."""
+
+    # new programmers look away, this is not how you do it
+    ind = resp.index("js_custid")
+    return int(resp[ind + 11: resp.index(";", ind)])
+
+
+def get_irservice_vars(resp: str) -> dict:
+    """Return the raw JSON of every `extractJSON` variable in the response.
+
+    Scans the response once, jumping between assignments with `str.find`.
+    The values are left undecoded for `load_listing`, as most are never used.
+    Only the first assignment to a variable is kept.
+    """
+
+    marker = " = extractJSON('"
+    found = {}
+
+    start = resp.find(marker)
+    while start != -1:
+        end = resp.find("');", start)
+        if end == -1:
+            break
+
+        name = resp.rfind("var ", max(start - 128, 0), start) + 4
+        if name > 3 and resp[name:start].isidentifier():
+            found.setdefault(resp[name:start], resp[start + len(marker):end])
+
+        start = resp.find(marker, end)
+
+    return found
+
+
+def get_listings(resp: str) -> dict:
+    """Return the raw JSON of general iRacing listings from the home page.
+
+    For eg; current tracks, cars, series, etc. Use `load_listing` to parse.
+    """
+
+    found = get_irservice_vars(resp)
+
+    listings = {}
+    for item, key in LISTINGS.items():
+        try:
+            listings[item] = found[key]
+        except KeyError as error:
+            log.error("Failed to parse %s: %r", item, error)
+            raise  # if this happens iRacing is probably down
+
+    return listings
+
+
+class Listings(MutableMapping):
+    """Mapping of the general iRacing listings, parsed on first access.
+
+    Holds the raw JSON returned from `get_listings` until each listing is
+    used, most clients never touch most of them. Items never loaded from
+    iRacing are empty.
+    """
+
+    def __init__(self, listings: dict = None):
+        self._raw = {}
+        self._parsed = self._empty()
+        self.load(listings or {})
+
+    @staticmethod
+    def _empty() -> dict:
+        """Return new empty listings, not shared with other instances."""
+
+        return {
+            "tracks": {},
+            "cars": {},
+            "division": {},
+            "car_class": {},
+            "club": {},
+            "season": None,
+            "year_and_quarter": (None, None),
+        }
+
+    def load(self, listings: dict) -> None:
+        """Replace our listings with the raw listings from iRacing."""
+
+        for item, raw in listings.items():
+            self._raw[item] = raw
+            self._parsed.pop(item, None)
+
+    def __getitem__(self, item):
+        if item in self._raw:
+            try:
+                self._parsed[item] = load_listing(
+                    LISTINGS[item],
+                    self._raw[item],
+                )
+            except Exception as error:
+                log.error("Failed to parse %s: %r", item, error)
+                raise  # if this happens iRacing is probably down
+            del self._raw[item]
+
+        return self._parsed[item]
+
+    def __setitem__(self, item, value):
+        self._raw.pop(item, None)
+        self._parsed[item] = value
+
+    def __delitem__(self, item):
+        if item not in self._raw and item not in self._parsed:
+            raise KeyError(item)
+        self._raw.pop(item, None)
+        self._parsed.pop(item, None)
+
+    def __iter__(self):
+        return iter(set(self._parsed) | set(self._raw))
+
+    def __len__(self):
+        return len(set(self._parsed) | set(self._raw))
+
+
+def load_listing(key: str, raw: str) -> object:
+    """Parse the raw JSON listing for the javascript variable key."""
+
+    loaded = json.loads(raw.replace("+", " "))
+
+    if key in ("SeasonListing", "YearAndQuarterListing"):
+        return loaded
+
+    return {x["id"]: x for x in loaded}
+
+
+def get_irservice_json(key, resp, appear=1):
+    """Return the raw JSON value for a key from the text response."""
 
     # this function should not exist. iRacing needs to provide this
     # information in a more sane fashion. string parsing javascript
@@ -77,14 +351,13 @@ def get_irservice_var(key, resp, appear=1):
     for _ in range(appear):
         ind1 = resp.index(str2find, ind1 + 1)
 
-    loaded = json.loads(resp[
-        ind1 + len(str2find): resp.index("');", ind1)
-    ].replace("+", " "))
+    return resp[ind1 + len(str2find): resp.index("');", ind1)]
 
-    if key in ("SeasonListing", "YearAndQuarterListing"):
-        return loaded
 
-    return {x["id"]: x for x in loaded}
+def get_irservice_var(key, resp, appear=1):
+    """Parse the value for a key from the text response."""
+
+    return load_listing(key, get_irservice_json(key, resp, appear))
 
 
 def as_timestamp(time_string):
@@ -0,0 +1,406 @@
+"""Storage of populated results.
+
+Results are stored either as a tree of JSON files, the default, or in a single
+SQLite database. Both are addressed by category and integer IDs, the same way
+as `index.ResultsIndex`; eg, ("laps", league, season, race, member). Use
+`open_store` to open either from a path or "sqlite:<path>" string.
+"""
+
+
+import io
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from abc import ABC
+from abc import abstractmethod
+
+from .index import ResultsIndex
+from .compression import FORMATS
+from .compression import dumps
+from .compression import loads
+from .compression import open_writer
+
+
+SQLITE_PREFIX = "sqlite:"
+
+
+class Store(ABC):
+    """Base results store, subclasses implement the storage.
+
+    IDs passed to the lookup methods are ints, or None to match any ID.
+    """
+
+    # ID columns of each category, in path order
+    CATEGORIES = {
+        "leagues": ("league_id", ),
+        "members": ("league_id", "cust_id"),
+        "seasons": ("league_id", "season_id"),
+        "races": ("league_id", "season_id", "subsession_id"),
+        "laps": ("league_id", "season_id", "subsession_id", "cust_id"),
+    }
+
+    @abstractmethod
+    def find(self, category: str, *ids: int) -> list:
+        """Return the sorted ID tuples as long as ids which match them."""
+
+    def ids(self, category: str, *ids: int) -> list:
+        """Return the sorted IDs directly below the matching IDs."""
+
+        return sorted({key[-1] for key in self.find(category, *ids, None)})
+
+    def keys(self, category: str, *ids: int) -> list:
+        """Return the full ID tuples of all results below the matching IDs."""
+
+        missing = len(self.CATEGORIES[category]) - len(ids)
+        return self.find(category, *ids, *[None] * missing)
+
+    @abstractmethod
+    def load(self, category: str, *ids: int) -> object:
+        """Return the result with the full IDs, raises KeyError if missing."""
+
+    def load_all(self, category: str, *ids: int) -> list:
+        """Return all results below the matching IDs, in ID order."""
+
+        return [self.load(category, *key) for key in self.keys(category, *ids)]
+
+    @abstractmethod
+    def exists(self, category: str, *ids: int) -> bool:
+        """Check if the result with the full IDs is stored."""
+
+    @abstractmethod
+    def versions(self, category: str, *ids: int) -> list:
+        """Return (IDs, version) of all results below the matching IDs.
+
+        Versions are cheap to get and change whenever the result does.
+        """
+
+    @abstractmethod
+    def raw(self, category: str, *ids: int) -> bytes:
+        """Return the stored bytes of the result with the full IDs."""
+
+    @abstractmethod
+    def write(self, obj: object, category: str, *ids: int) -> None:
+        """Store the result, replacing any previous."""
+
+    @abstractmethod
+    def stream(self, write: callable, category: str, *ids: int) -> bool:
+        """Store the JSON text written to a file-like object by write.
+
+        Args:
+            write: callable writing the JSON to the file-like object it is
+                   passed, returning boolean True if it should be stored
+            category: category of the result
+            ids: IDs of the result
+
+        Returns:
+            the return of write
+        """
+
+    @abstractmethod
+    def location(self, category: str, *ids: int) -> str:
+        """Return a description of where results are stored, for humans."""
+
+    @abstractmethod
+    def manifest_path(self, filename: str) -> str:
+        """Return the path of the populate manifest for this store."""
+
+
+class FileStore(Store):
+    """Results stored as a tree of JSON files below the path.
+
+    Files are written in the format given, see `compression.FORMATS`, and
+    read in whichever format they are found. Streamed results, the laps, are
+    written as received so are always compact JSON, even if the format is
+    json, rather than decoding the whole response to indent it.
+    """
+
+    def __init__(self, path: str, create: bool = True, fmt: str = "json"):
+        self.path = path
+        self.format = fmt
+        self._index = None
+
+        if os.path.exists(path) and not os.path.isdir(path):
+            raise SystemExit(
+                "Results directory {} already exists, as a file. Bailing."
+                .format(path)
+            )
+        if not os.path.isdir(path):
+            if not create:
+                raise FileNotFoundError(path)
+            os.makedirs(path)
+
+    def __getstate__(self) -> dict:
+        # the index is rebuilt when needed, rather than sent to processes
+        return {"path": self.path, "format": self.format, "_index": None}
+
+    @property
+    def index(self) -> ResultsIndex:
+        """Index of the results tree, walked the first time it is needed."""
+
+        if self._index is None:
+            self._index = ResultsIndex(self.path)
+        return self._index
+
+    def _path(self, category: str, *ids: int, fmt: str = None) -> str:
+        """Return the file path of the result with the full IDs."""
+
+        return os.path.join(
+            self.path,
+            category,
+            *[str(x) for x in ids[:-1]],
+            "{}{}".format(ids[-1], FORMATS[fmt or self.format]),
+        )
+
+    def _paths(self, category: str, *ids: int) -> list:
+        """Return the possible file paths of the result, ours first."""
+
+        return [self._path(category, *ids)] + [
+            self._path(category, *ids, fmt=fmt)
+            for fmt in FORMATS if fmt != self.format
+        ]
+
+    def find(self, category: str, *ids: int) -> list:
+        return [key for key, _ in self.index.find(category, *ids)]
+
+    def raw(self, category: str, *ids: int) -> bytes:
+        for file_path in self._paths(category, *ids):
+            try:
+                with io.open(file_path, "rb") as open_result:
+                    return open_result.read()
+            except FileNotFoundError:
+                continue
+        raise KeyError((category, ) + ids)
+
+    def load(self, category: str, *ids: int) -> object:
+        return loads(self.raw(category, *ids))
+
+    def exists(self, category: str, *ids: int) -> bool:
+        for file_path in self._paths(category, *ids):
+            if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+                return True
+        return False
+
+    def versions(self, category: str, *ids: int) -> list:
+        missing = len(self.CATEGORIES[category]) - len(ids)
+        versions = []
+        for key, file_path in self.index.find(
+                category, *ids, *[None] * missing):
+            stat = os.stat(file_path)
+            versions.append((key, "{}:{}".format(
+                stat.st_mtime_ns,
+                stat.st_size,
+            )))
+        return versions
+
+    def _replace(self, temp_path: str, category: str, *ids: int) -> None:
+        """Move the written temp file into place, removing other formats."""
+
+        paths = self._paths(category, *ids)
+        os.replace(temp_path, paths[0])
+        for file_path in paths[1:]:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        self._index = None
+
+    def _temp_path(self, category: str, *ids: int) -> str:
+        """Return a temp file path for the result, creating its directory."""
+
+        file_path = self._path(category, *ids)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        return "{}.{}.tmp".format(file_path, threading.get_ident())
+
+    def write(self, obj: object, category: str, *ids: int) -> None:
+        temp_path = self._temp_path(category, *ids)
+        with io.open(temp_path, "wb") as open_results:
+            open_results.write(dumps(obj, self.format))
+        self._replace(temp_path, category, *ids)
+
+    def stream(self, write: callable, category: str, *ids: int) -> bool:
+        temp_path = self._temp_path(category, *ids)
+
+        try:
+            with io.open(temp_path, "wb") as open_results:
+                with open_writer(open_results, self.format) as writer:
+                    written = write(writer)
+            if written:
+                self._replace(temp_path, category, *ids)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return written
+
+    def location(self, category: str, *ids: int) -> str:
+        return os.path.join(self.path, category, *[str(x) for x in ids])
+
+    def manifest_path(self, filename: str) -> str:
+        return os.path.join(self.path, filename)
+
+
+class SQLiteStore(Store):
+    """Results stored as compact JSON in a single SQLite database.
+
+    There is a table per category, keyed by its ID columns. Laps are also
+    indexed by driver, so all laps of a driver in a season is a lookup.
+    """
+
+    def __init__(self, path: str, create: bool = True):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+        if not os.path.isfile(path):
+            if not create:
+                raise FileNotFoundError(path)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def __getstate__(self) -> dict:
+        # connections can't be shared with other processes
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"], create=False)
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """Connection to the database, created on first use."""
+
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            for category, columns in self.CATEGORIES.items():
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS {} ({}, hash TEXT, data TEXT, "
+                    "PRIMARY KEY ({}))".format(
+                        category,
+                        ", ".join("{} INTEGER".format(x) for x in columns),
+                        ", ".join(columns),
+                    )
+                )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS laps_driver "
+                "ON laps (cust_id, season_id)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _select(self, columns: str, category: str, ids: tuple,
+                order: str = None) -> list:
+        """Select the columns of rows matching the IDs."""
+
+        where = [
+            ("{} = ?".format(column), int(_id))
+            for column, _id in zip(self.CATEGORIES[category], ids)
+            if _id is not None
+        ]
+        query = "SELECT {} FROM {}".format(columns, category)
+        if where:
+            query += " WHERE {}".format(" AND ".join(x[0] for x in where))
+        if order:
+            query += " ORDER BY {}".format(order)
+
+        with self._lock:
+            return self._db.execute(query, [x[1] for x in where]).fetchall()
+
+    def find(self, category: str, *ids: int) -> list:
+        columns = ", ".join(self.CATEGORIES[category][:len(ids)])
+        return self._select("DISTINCT {}".format(columns), category, ids,
+                            columns)
+
+    def load(self, category: str, *ids: int) -> object:
+        return json.loads(self.raw(category, *ids))
+
+    def load_all(self, category: str, *ids: int) -> list:
+        return [json.loads(row[0]) for row in self._select(
+            "data",
+            category,
+            ids,
+            ", ".join(self.CATEGORIES[category]),
+        )]
+
+    def exists(self, category: str, *ids: int) -> bool:
+        return bool(self._select("1", category, ids))
+
+    def versions(self, category: str, *ids: int) -> list:
+        columns = self.CATEGORIES[category]
+        return [(row[:-1], row[-1]) for row in self._select(
+            "{}, hash".format(", ".join(columns)),
+            category,
+            ids,
+            ", ".join(columns),
+        )]
+
+    def raw(self, category: str, *ids: int) -> bytes:
+        rows = self._select("data", category, ids)
+        if not rows or len(ids) != len(self.CATEGORIES[category]):
+            raise KeyError((category, ) + ids)
+        return rows[0][0].encode("utf-8")
+
+    def _store(self, text: str, category: str, *ids: int) -> None:
+        """Store the JSON text of the result."""
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO {} VALUES ({})".format(
+                    category,
+                    ", ".join("?" * (len(ids) + 2)),
+                ),
+                [int(x) for x in ids] + [
+                    hashlib.sha1(text.encode("utf-8")).hexdigest(),
+                    text,
+                ],
+            )
+            self._db.commit()
+
+    def write(self, obj: object, category: str, *ids: int) -> None:
+        self._store(json.dumps(
+            obj,
+            separators=(",", ":"),
+            sort_keys=True,
+            ensure_ascii=False,
+        ), category, *ids)
+
+    def stream(self, write: callable, category: str, *ids: int) -> bool:
+        buffer = io.StringIO()
+        written = write(buffer)
+        if written:
+            self._store(buffer.getvalue(), category, *ids)
+        return written
+
+    def location(self, category: str, *ids: int) -> str:
+        return "{}{} ({})".format(SQLITE_PREFIX, self.path, " ".join(
+            [category] + [str(x) for x in ids]
+        ))
+
+    def manifest_path(self, filename: str) -> str:
+        return "{}.{}".format(os.path.splitext(self.path)[0], filename)
+
+
+def open_store(spec: str, create: bool = True, fmt: str = "json") -> Store:
+    """Open the results store.
+
+    Args:
+        spec: directory path, or "sqlite:<path>" for an SQLite database
+        create: boolean to create the store if missing, otherwise raises
+                FileNotFoundError
+        fmt: format to write files in, see `compression.FORMATS`. SQLite
+             stores always hold compact JSON, so only accept json
+
+    Returns:
+        Store object
+    """
+
+    if spec.startswith(SQLITE_PREFIX):
+        if fmt != "json":
+            raise SystemExit(
+                "Format {} is not supported by SQLite stores, results in {} "
+                "are always compact JSON".format(fmt, spec)
+            )
+        return SQLiteStore(
+            os.path.expanduser(spec[len(SQLITE_PREFIX):]),
+            create,
+        )
+    return FileStore(os.path.expanduser(spec), create, fmt)
@@ -3,20 +3,22 @@
 
 import io
 import os
-import json
 from getpass import getpass
 
 from docopt import docopt
 
 from . import __version__
 from .stats import Client
+from .compression import loads
+from .stats.session import SessionCache
+from .stats.response_cache import open_cache
 
 
 def read_json(filepath: str) -> object:
-    """Reads the JSON object at filepath."""
+    """Reads the JSON object at filepath, which may be compressed."""
 
-    with io.open(filepath, "r", encoding="utf-8") as openfile:
-        return json.loads(openfile.read())
+    with io.open(filepath, "rb") as openfile:
+        return loads(openfile.read())
 
 
 def get_args(doc: str) -> dict:
@@ -33,6 +35,15 @@ def get_args(doc: str) -> dict:
     return args
 
 
+def _ask_password() -> str:
+    """Prompt for the iRacing.com password."""
+
+    try:
+        return getpass()
+    except KeyboardInterrupt:
+        raise SystemExit("Interrupted")
+
+
 def get_client(args) -> Client:
     """Creates the stats.Client with the credentials passed."""
 
@@ -45,13 +56,25 @@ def get_client(args) -> Client:
         except KeyboardInterrupt:
             raise SystemExit("Interrupted")
 
-    if args["--passwd"]:
-        client = Client(args["--user"], args["--passwd"], args["--debug"])
-    else:
-        client = Client(args["--user"], getpass(), args["--debug"])
+    session = None
+    if not args.pop("--no-session", False):
+        session = SessionCache(args.get("--session"))
+
+    client = Client(
+        args["--user"],
+        args["--passwd"],
+        args["--debug"],
+        workers=args.get("--jobs") or 1,
+        session=session,
+        responses=open_cache(args["--cache"]) if args.get("--cache") else None,
+        # only prompt for the password when we have no session to reuse
+        ask_password=_ask_password,
+    )
 
     args.pop("--user")
     args.pop("--passwd")
     args.pop("--debug")
+    args.pop("--session", None)
+    args.pop("--cache", None)
 
     return client
@@ -51,11 +51,16 @@ setup(
     packages=find_packages(exclude=["test"]),
     python_requires=">= 3.7.4",
     install_requires=[
-        "RequestsThrottler >= 0.2.5",
         "requests >= 2.2.0",
         "docopt >= 0.6.1",
         "jinja2 >= 2.10.3",
     ],
+    extras_require={
+        "async": ["aiohttp >= 3.6.0"],
+        "stream": ["ijson >= 3.1"],
+        "zstd": ["zstandard >= 0.15"],
+        "brotli": ["brotli >= 1.0"],
+    },
     cmdclass={"test": PyTest},
     tests_require=["mock", "pytest", "pytest-cov"],
     entry_points={"console_scripts": [
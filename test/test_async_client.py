@@ -0,0 +1,108 @@
+"""Tests of the asyncio stats client against a stub iRacing server."""
+
+
+import asyncio
+
+import pytest
+
+from irace.stats import async_client
+from irace.stats.utils import LISTINGS
+from irace.stats.constants import URLs
+from irace.stats.response_cache import ResponseCache
+
+
+web = pytest.importorskip("aiohttp.web")
+
+
+LAPS = {"header": {"trackName": "Road+America"}, "lapData": []}
+
+
+class MemoryCache(ResponseCache):
+    """Response cache held in a dict."""
+
+    def __init__(self, policies: dict = None):
+        super().__init__(policies)
+        self.responses = {}
+
+    def _load(self, key: str) -> (float, str):
+        return self.responses.get(key)
+
+    def _store(self, key: str, url: str, created: float, text: str) -> None:
+        self.responses[key] = (created, text)
+
+
+def _home_page() -> str:
+    """Return a home page with the customer ID and empty listings."""
+
+    lines = ["var js_custid = 1234;"]
+    for key in LISTINGS.values():
+        lines.append("var {0} = extractJSON('{{}}');".format(key))
+    return "\n".join(lines)
+
+
+def _stub_app(requests: list, failures: int) -> web.Application:
+    """Return the stub app, failing the first laps requests with 429s."""
+
+    async def login(request):
+        requests.append(URLs.LOGIN)
+        resp = web.Response(text=_home_page())
+        resp.set_cookie("irsso_membersv2", "session")
+        return resp
+
+    async def laps(request):
+        requests.append(URLs.SESSION_LAPS)
+        if requests.count(URLs.SESSION_LAPS) <= failures:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        return web.json_response(LAPS)
+
+    app = web.Application()
+    app.router.add_post("/" + URLs.LOGIN, login)
+    app.router.add_post("/" + URLs.SESSION_LAPS, laps)
+    return app
+
+
+async def _fetch_laps(monkeypatch, failures: int, responses=None,
+                      fetches: int = 1):
+    """Fetch laps from the stub server, returning (laps, requests)."""
+
+    requests = []
+    runner = web.AppRunner(_stub_app(requests, failures))
+    await runner.setup()
+    site = web.TCPSite(runner, "localhost", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    monkeypatch.setattr(URLs, "BASE", "http://localhost:{}".format(port))
+
+    try:
+        async with async_client.AsyncStats(
+                "user", "password", responses=responses) as client:
+            assert client.customer_id == 1234
+            for _ in range(fetches):
+                laps = await client.session_laps(1, 2)
+    finally:
+        await runner.cleanup()
+
+    return laps, requests
+
+
+def test_retry(monkeypatch):
+    """Assert 429 responses are retried until the laps are returned."""
+
+    laps, requests = asyncio.run(_fetch_laps(monkeypatch, failures=2))
+
+    assert laps == {"header": {"trackName": "Road America"}, "lapData": []}
+    assert requests == [URLs.LOGIN] + [URLs.SESSION_LAPS] * 3
+
+
+def test_cache(monkeypatch):
+    """Assert cached responses are reused rather than requested again."""
+
+    laps, requests = asyncio.run(_fetch_laps(
+        monkeypatch,
+        failures=0,
+        responses=MemoryCache(),
+        fetches=2,
+    ))
+
+    assert laps == {"header": {"trackName": "Road America"}, "lapData": []}
+    assert requests == [URLs.LOGIN, URLs.SESSION_LAPS]
@@ -0,0 +1,32 @@
+"""Tests of irace.stats.utils.format_results."""
+
+
+from irace.stats.utils import format_results
+from irace.stats.constants import Layouts
+
+
+HEADER = {"1": "a", "2": "b", "3": "c"}
+
+
+def test_other_columns_kept():
+    """Assert columns missing from the first row aren't dropped."""
+
+    results = [{"1": 1, "2": 2}, {"1": 7, "3": 9}]
+
+    assert format_results(results, HEADER, Layouts.DICTS) == [
+        {"a": 1, "b": 2},
+        {"a": 7, "c": 9},
+    ]
+    assert [x._asdict() for x in format_results(
+        results,
+        HEADER,
+        Layouts.ROWS,
+    )] == [
+        {"a": 1, "b": 2, "c": None},
+        {"a": 7, "b": None, "c": 9},
+    ]
+    assert format_results(results, HEADER, Layouts.COLUMNS) == {
+        "a": [1, 7],
+        "b": [2, None],
+        "c": [None, 9],
+    }
@@ -0,0 +1,54 @@
+"""Tests of formatting iRacing times in irace.parse."""
+
+
+import pytest
+
+from irace.parse.laps import Laps
+from irace.parse.utils import ticks_string
+from irace.parse.utils import time_string_raw
+
+
+@pytest.mark.parametrize("ticks, expected", (
+    (-1, "--:--"),
+    (0, "--:--"),
+    # exact, the float seconds this replaced truncated these one tick low
+    (29, "00:00.0029"),
+    (12345, "00:01.2345"),
+    (943573, "01:34.3573"),
+    (35999999, "59:59.9999"),
+    (36000000, "01:00:00.0000"),
+    (36012345, "01:00:01.2345"),
+    (900000000, "25:00:00.0000"),
+))
+def test_ticks_string(ticks, expected):
+    """Assert ticks are formatted exactly, with hours only if any."""
+
+    assert ticks_string(ticks) == expected
+
+
+def test_time_string_raw():
+    """Assert float timestamps from iRacing are formatted as ticks."""
+
+    assert time_string_raw(943573.0) == "01:34.3573"
+    assert time_string_raw(0.0) == "--:--"
+
+
+def test_lap_time_strings():
+    """Assert lap and total times are the differences of session times."""
+
+    laps = Laps({
+        "header": {"trackName": "Road America", "trackConfig": "Full"},
+        "drivers": [{"displayname": "Driver", "custid": 1,
+                     "bestlaptime": 12345, "bestlapnum": 1}],
+        "lapData": [
+            {"lap_num": 0, "flags": 0, "ses_time": 100},
+            {"lap_num": 1, "flags": 0, "ses_time": 12445},
+            {"lap_num": 2, "flags": 0, "ses_time": 36012474},
+        ],
+    })
+
+    assert [lap.time_string for lap in laps.laps[1:]] == [
+        "00:01.2345",
+        "01:00:00.0029",
+    ]
+    assert laps.total_time_string == "01:00:01.2474"
@@ -0,0 +1,117 @@
+"""Tests of the incremental season leaderboard in irace.parse.season."""
+
+
+import random
+
+import pytest
+
+from irace.parse.race import Race
+from irace.parse.season import Leaderboard
+
+
+def _race(sub_session_id: int, points: dict) -> Race:
+    """Return a race finishing in the order of points, a cust ID mapping."""
+
+    return Race([], {
+        "subsessionid": sub_session_id,
+        "cornersperlap": 14,
+        "rows": [{
+            "simsesname": "RACE",
+            "custid": cust_id,
+            "displayname": "Driver {}".format(cust_id),
+            "finishpos": position,
+            "startpos": position,
+            "league_points": driver_points,
+            "incidents": 0,
+            "lapscomplete": 10,
+        } for position, (cust_id, driver_points) in enumerate(points.items())],
+    })
+
+
+def _recompute(races: list) -> list:
+    """Return the standings of races as (cust ID, points, position).
+
+    Computed from scratch, ties are ordered as the drivers were first seen
+    and share the position of the first of them.
+    """
+
+    totals = {}
+    for race in races:
+        for result in race.results:
+            totals.setdefault(result["custid"], 0)
+            totals[result["custid"]] += max(result["league_points"], 0)
+
+    seen = list(totals)
+    ranking = sorted(totals, key=lambda x: (-totals[x], seen.index(x)))
+
+    standings = []
+    for i, cust_id in enumerate(ranking, 1):
+        if standings and standings[-1][1] == totals[cust_id]:
+            position = standings[-1][2]
+        else:
+            position = i
+        standings.append((cust_id, totals[cust_id], position))
+
+    return standings
+
+
+def _season(seed: int) -> list:
+    """Return made up races, with few points values so there are ties."""
+
+    rand = random.Random(seed)
+    races = []
+    for race in range(8):
+        drivers = rand.sample(range(1000, 1012), rand.randrange(3, 10))
+        races.append(_race(race, {
+            cust_id: rand.choice((-1, 0, 1, 2, 2, 3, 5))
+            for cust_id in drivers
+        }))
+    return races
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_standings_and_deltas(seed):
+    """Assert adding races in order matches recomputing the standings."""
+
+    races = _season(seed)
+    leaderboard = Leaderboard()
+
+    for count, race in enumerate(races, 1):
+        before = {x[0]: x[2] for x in _recompute(races[:count - 1])}
+        changes = leaderboard.add(race, delta=True)
+        expected = _recompute(races[:count])
+
+        assert [
+            (x.driver_id, x.points, x.position)
+            for x in leaderboard.standings
+        ] == expected
+
+        assert sorted(
+            (x.driver.driver_id, x.old, x.new) for x in changes
+        ) == sorted(
+            (cust_id, before.get(cust_id, -1), position)
+            for cust_id, _, position in expected
+            if before.get(cust_id) != position
+        )
+
+
+def test_ties():
+    """Assert drivers with the same points share the position."""
+
+    leaderboard = Leaderboard()
+    leaderboard.add(_race(1, {1: 5, 2: 3, 3: 3, 4: 1}))
+    changes = leaderboard.add(_race(2, {4: 2, 1: 0, 3: 0}), delta=True)
+
+    assert [
+        (x.driver_id, x.position) for x in leaderboard.standings
+    ] == [(1, 1), (2, 2), (3, 2), (4, 2)]
+    assert [(x.driver.driver_id, x.old, x.new) for x in changes] == [(4, 4, 2)]
+
+
+def test_duplicate_race():
+    """Assert the same race can't be added twice."""
+
+    leaderboard = Leaderboard()
+    leaderboard.add(_race(1, {1: 5}))
+    with pytest.raises(ValueError):
+        leaderboard.add(_race(1, {1: 5}))
@@ -0,0 +1,68 @@
+"""Tests of fetching races and laps in irace.populate."""
+
+
+import json
+
+from irace import populate
+from irace.store import open_store
+from irace.manifest import Manifest
+
+
+SUB_SESSION_ID = 9000
+DRIVERS = {101: 1001, 102: 1002}  # group ID: cust ID
+EMPTY_GROUP = 102
+
+
+class StubClient:
+    """Stats client with one race, one of the drivers has no laps."""
+
+    def __init__(self):
+        self.laps_requested = []
+
+    def league_season_calendar(self, league_id, season_id):
+        return {"rowcount": 1, "rows": [{"subsessionid": SUB_SESSION_ID}]}
+
+    def session_results(self, sub_session_id):
+        return {"rows": [
+            {"groupid": group_id, "custid": cust_id}
+            for group_id, cust_id in DRIVERS.items()
+        ]}
+
+    def session_laps(self, sub_session_id, group_id, output=None):
+        self.laps_requested.append(group_id)
+        if group_id == EMPTY_GROUP:
+            return False
+        json.dump({"lapData": [{"lap_num": 0}]}, output)
+        return True
+
+
+def _populate(path: str) -> list:
+    """Fetch the results into path, returning the laps requested."""
+
+    args = {"--club": 637, "--season": 1, "--jobs": 2}
+    args["store"] = open_store(path)
+    args["manifest"] = Manifest(
+        args["store"].manifest_path(Manifest.FILENAME),
+    )
+
+    client = StubClient()
+    populate.fetch_results(args, client)
+    return sorted(client.laps_requested)
+
+
+def test_laps_fetched_once(tmp_path):
+    """Assert laps, including empty laps, are not fetched again."""
+
+    assert _populate(str(tmp_path)) == sorted(DRIVERS)
+    assert _populate(str(tmp_path)) == []
+
+
+def test_empty_laps_retried(tmp_path, monkeypatch):
+    """Assert empty laps are retried a limited number of times."""
+
+    monkeypatch.setattr(Manifest, "EMPTY_RETRY", -1)
+
+    assert _populate(str(tmp_path)) == sorted(DRIVERS)
+    for _ in range(Manifest.EMPTY_ATTEMPTS - 1):
+        assert _populate(str(tmp_path)) == [EMPTY_GROUP]
+    assert _populate(str(tmp_path)) == []
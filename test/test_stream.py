@@ -0,0 +1,97 @@
+"""Tests of streaming JSON decoding in irace.stats.stream."""
+
+
+import io
+import copy
+import json
+
+import pytest
+
+from irace.stats import stream
+from irace.stats.utils import format_strings
+from irace.stats.constants import URLs
+from irace.stats.constants import StringFields
+
+
+RESPONSES = (
+    {},
+    [],
+    {"rows": []},
+    {"empty": {}, "nested": [[], {}, [{}]]},
+    ["a+b", "c%2520d"],
+    {
+        "header": {"trackName": "Road+America", "trackConfig": "Full"},
+        "drivers": [
+            {"displayname": "Some+Driver%2520Jr", "custid": 1},
+            {"displayname": "", "custid": 2, "tags": ["x+y"]},
+        ],
+        "lapData": [
+            {"lap_num": 0, "flags": 0, "ses_time": 0, "note": "a+b"},
+            {"lap_num": 1, "flags": 6, "ses_time": 943573.5, "ok": True},
+            {"lap_num": 2, "flags": 0, "ses_time": None, "ok": False},
+        ],
+        "count": 3,
+    },
+)
+
+FIELDS = (None, StringFields.get(URLs.SESSION_LAPS))
+
+
+def _expected(response: object, fields: tuple) -> object:
+    """Return the response as decoded by json.loads and format_strings."""
+
+    expected = copy.deepcopy(response)
+    if fields is None or isinstance(expected, dict):
+        format_strings(expected, fields)
+    return expected
+
+
+@pytest.fixture(params=[True, False], ids=["ijson", "no ijson"])
+def ijson_available(request, monkeypatch):
+    """Run with ijson, if installed, and with the fallback without it."""
+
+    if request.param:
+        if stream.ijson is None:
+            pytest.skip("ijson is not installed")
+    else:
+        monkeypatch.setattr(stream, "ijson", None)
+    return request.param
+
+
+@pytest.mark.parametrize("fields", FIELDS)
+@pytest.mark.parametrize("response", RESPONSES)
+def test_load(ijson_available, response, fields):
+    """Assert load decodes the same as json.loads and format_strings."""
+
+    raw = io.BytesIO(json.dumps(response).encode("utf-8"))
+    assert stream.load(raw, fields=fields) == _expected(response, fields)
+
+
+@pytest.mark.parametrize("fields", FIELDS)
+@pytest.mark.parametrize("response", RESPONSES)
+def test_copy(ijson_available, response, fields):
+    """Assert copy writes the same JSON as json.loads and format_strings."""
+
+    raw = io.BytesIO(json.dumps(response).encode("utf-8"))
+    output = io.StringIO()
+    expected = _expected(response, fields)
+
+    assert stream.copy(raw, output, fields=fields) == bool(expected)
+    assert json.loads(output.getvalue()) == expected
+
+
+@pytest.mark.parametrize("fields", FIELDS)
+@pytest.mark.parametrize("response", RESPONSES)
+def test_loads(response, fields):
+    """Assert loads of response text decodes the same as load."""
+
+    text = json.dumps(response)
+    assert stream.loads(text, fields=fields) == _expected(response, fields)
+
+
+def test_no_unquote(ijson_available):
+    """Assert strings are left alone if not unquoting."""
+
+    response = {"drivers": [{"displayname": "Some+Driver"}]}
+    raw = io.BytesIO(json.dumps(response).encode("utf-8"))
+    assert stream.load(raw, unquote_strings=False) == response